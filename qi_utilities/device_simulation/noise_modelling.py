@@ -6,13 +6,19 @@ Authors: Marios Samiotis
 """
 
 import ast
+import json
+import pickle
+import hashlib
 import numpy as np
+from pathlib import Path
 from qiskit_aer import noise
 from scipy.constants import Planck, Boltzmann
 
 T1_FUDGE_FACTOR = 1.3
 T2_FUDGE_FACTOR = 1.3
 
+_noise_model_cache = {}
+
 def depolarization_param(num_qubits: int,
                          epsilon_cl: float):
     """
@@ -31,6 +37,36 @@ def depolarization_param(num_qubits: int,
     lambda_rate = (2**(2*num_qubits)-1)/2**(2*num_qubits) * (1-p_RB_decay)
     return lambda_rate
 
+def thermal_relaxation_qubit_error(processor_specs: dict,
+                                   qubit_idx: int,
+                                   time: float):
+    """
+    This function instantiates the relaxation + pure dephasing error channel
+    of a single qubit for a given duration, e.g. of a delay or of a measurement
+    operation, including the residual excited state population of the qubit at
+    the base temperature of the processor.
+
+    Since the channel composes over consecutive durations, the error channel of
+    an N * dt delay is identical to N consecutive error channels of a 1 * dt delay.
+
+    Args:
+        processor_specs (dict):
+            The processor specs, as those are stored within the backend_parameters.json file.
+
+        qubit_idx (int):
+            The index of the qubit, following the ordering of the processor specs 'Qubits'.
+
+        time (float):
+            The duration of the error channel in seconds.
+    """
+
+    qubit_specs = processor_specs['Qubits'][list(processor_specs['Qubits'])[qubit_idx]]
+    decay_prob = 1 / (1 + np.exp( (-Planck * qubit_specs['Frequency [Hz]']) / (Boltzmann * processor_specs['Base temperature [K]']) ))
+    return noise.thermal_relaxation_error(t1 = T1_FUDGE_FACTOR * qubit_specs['T1 [s]'],
+                                          t2 = qubit_specs['T2 [s]'],
+                                          time = time,
+                                          excited_state_population = 1 - decay_prob)
+
 def create_noise_model(processor_specs: dict,
                        noise_applied: dict = {
                              'delay_T1_T2': True,
@@ -75,15 +111,10 @@ def create_noise_model(processor_specs: dict,
     
     for qubit_idx in range(len(qubit_list)):
         
-        decay_prob = 1 / (1 + np.exp( (-Planck * processor_specs['Qubits'][qubit_list[qubit_idx]]['Frequency [Hz]']) / (Boltzmann * processor_specs['Base temperature [K]']) ))
-        relaxation_dephasing_delay = noise.thermal_relaxation_error(t1 = T1_FUDGE_FACTOR * processor_specs['Qubits'][qubit_list[qubit_idx]]['T1 [s]'],
-                                                                    t2 = processor_specs['Qubits'][qubit_list[qubit_idx]]['T2 [s]'],
-                                                                    time = processor_specs['Delay duration [s]'],
-                                                                    excited_state_population = 1 - decay_prob)
-        relaxation_dephasing_measure = noise.thermal_relaxation_error(t1 = T1_FUDGE_FACTOR * processor_specs['Qubits'][qubit_list[qubit_idx]]['T1 [s]'],
-                                                                      t2 = processor_specs['Qubits'][qubit_list[qubit_idx]]['T2 [s]'],
-                                                                      time = processor_specs['Measurement duration [s]'],
-                                                                      excited_state_population = 1 - decay_prob)
+        relaxation_dephasing_delay = thermal_relaxation_qubit_error(processor_specs, qubit_idx,
+                                                                    processor_specs['Delay duration [s]'])
+        relaxation_dephasing_measure = thermal_relaxation_qubit_error(processor_specs, qubit_idx,
+                                                                      processor_specs['Measurement duration [s]'])
         
         epsilon_cl = 1 - (1 - processor_specs['Qubits'][qubit_list[qubit_idx]]['RB error'])**n_g
         lambda_param = depolarization_param(num_qubits=1, epsilon_cl=epsilon_cl)
@@ -113,4 +144,81 @@ def create_noise_model(processor_specs: dict,
             simulator_noise_model.add_quantum_error(depolarizing_error_CZ, ['cz'], ast.literal_eval(CZ_list[CZ_idx]), warnings=False)
             simulator_noise_model.add_quantum_error(depolarizing_error_CZ, ['cz'], ast.literal_eval(CZ_list[CZ_idx])[::-1], warnings=False)
 
-    return simulator_noise_model
\ No newline at end of file
+    return simulator_noise_model
+
+def processor_specs_hash(processor_specs: dict):
+    """
+    This function returns a hash of the contents of a processor specs dictionary,
+    so that noise models built from modified processor specs are never confused
+    with each other when cached.
+
+    Args:
+        processor_specs (dict):
+            The processor specs, as those are stored within the backend_parameters.json file.
+    """
+
+    return hashlib.sha256(json.dumps(processor_specs, sort_keys=True).encode()).hexdigest()
+
+def get_noise_model(processor_specs: dict,
+                    noise_applied: dict = {
+                          'delay_T1_T2': True,
+                          'sq_depolarization': True,
+                          'readout_T1_T2': True,
+                          'readout_assignment': True,
+                          'CZ_depolarization': True
+                    },
+                    backend_name: str = None,
+                    cache_directory: str = None):
+    """
+    This function returns the noise model of create_noise_model, memoized by the
+    backend name, the noise_applied flags and the hash of the processor specs, so
+    that it is built only once per process. Optionally, the noise models are also
+    cached on disk as pickle files, so that new (e.g. worker) processes do not need
+    to rebuild them either.
+
+    The returned noise model is shared among all callers (the Aer simulators do not
+    modify it), hence it is read-only: callers who need a modified noise model must
+    modify a copy of it, e.g. copy.deepcopy(noise_model), or use create_noise_model.
+
+    Since the disk cache is loaded with pickle, which can execute arbitrary code,
+    cache_directory must be a trusted directory, writable only by the user.
+
+    Args:
+        processor_specs (dict):
+            The processor specs to be used for creating the noise model,
+            as those are stored within the backend_parameters.json file.
+
+        noise_applied (dict):
+            A dictionary in which individual noise models can be selected
+            to be applied. By default, all noise models are applied.
+
+        backend_name (str):
+            The name of the simulated backend.
+
+        cache_directory (str):
+            The (trusted) directory path in which the noise models are cached on disk.
+            Defaults to None, in which case they are only cached in memory.
+    """
+
+    cache_key = (backend_name, tuple(sorted(noise_applied.items())), processor_specs_hash(processor_specs))
+    if cache_key in _noise_model_cache:
+        return _noise_model_cache[cache_key]
+
+    cache_file_path = None
+    if cache_directory is not None:
+        cache_file_name = hashlib.sha256(repr(cache_key).encode()).hexdigest()
+        cache_file_path = Path(cache_directory) / f"noise_model_{backend_name}_{cache_file_name[:16]}.pkl"
+        if cache_file_path.exists():
+            with open(cache_file_path, 'rb') as file:
+                _noise_model_cache[cache_key] = pickle.load(file)
+            return _noise_model_cache[cache_key]
+
+    simulator_noise_model = create_noise_model(processor_specs, noise_applied)
+    _noise_model_cache[cache_key] = simulator_noise_model
+    if cache_file_path is not None:
+        cache_file_path.parent.mkdir(parents=True, exist_ok=True)
+        temporary_path = cache_file_path.with_suffix(".tmp")
+        with open(temporary_path, 'wb') as file:
+            pickle.dump(simulator_noise_model, file)
+        temporary_path.replace(cache_file_path)
+    return simulator_noise_model
@@ -9,16 +9,53 @@ Authors: Marios Samiotis, Jan Hemink
 """
 
 import os
+import copy
+import atexit
+import weakref
 import json
 import uuid
+import math
+import multiprocessing
+import numpy as np
+from concurrent.futures import Future, ProcessPoolExecutor, wait
 from typing import Union, List
 from datetime import datetime
 from dataclasses import dataclass
-from qiskit import QuantumCircuit, transpiler, transpile
+from qiskit import QuantumCircuit, transpiler
 from qiskit.circuit import Delay
 from qiskit.circuit import CircuitInstruction
+from qiskit.utils.units import apply_prefix
+from qiskit.providers import JobV1, JobStatus
+from qiskit.result import Result
 from qiskit_aer import AerSimulator, AerJob
-from qi_utilities.device_simulation.noise_modelling import create_noise_model
+from qi_utilities.device_simulation.noise_modelling import get_noise_model, thermal_relaxation_qubit_error
+from qi_utilities.utility_functions.raw_data_processing import SparseCounts, MAX_DENSE_COUNTS_BITS
+from qi_utilities.utility_functions.transpilation import transpile_cached
+
+_simulator_specs_cache = {}
+
+EXACT_SAMPLING_MAX_QUBITS = 10
+
+def load_simulator_specs(backend_name: str):
+    """
+    This function loads the specs of a simulated backend from the backend_parameters
+    JSON file. The file is parsed only once per process (or again whenever it has
+    been modified), hence the returned specs are shared and must not be modified.
+
+    Args:
+        backend_name (str):
+            The name of the simulated backend, as this is listed within the
+            backend_parameters JSON file.
+    """
+
+    device_simulation_path = os.path.dirname(os.path.abspath(__file__))
+    json_path = os.path.join(device_simulation_path, 'backend_parameters.json')
+    modification_time = os.path.getmtime(json_path)
+    if _simulator_specs_cache.get('Modification time') != modification_time:
+        with open(json_path, 'r') as file:
+            _simulator_specs_cache['Backends'] = json.load(file)
+        _simulator_specs_cache['Modification time'] = modification_time
+    return _simulator_specs_cache['Backends'][backend_name]
 
 @dataclass
 class job_result_data:
@@ -42,10 +79,15 @@ class ResultOrderedCounts:
     Wrapper class that modifies the ordering of binary strings
     in the counts dictionary so that they are returned in
     incremental binary order.
+
+    For bit registers larger than MAX_DENSE_COUNTS_BITS (or when sparse is True),
+    the counts are returned as a SparseCounts object containing only the observed
+    bitstrings, instead of a dictionary pre-filled with all 2**num_clbits bitstrings.
     """
 
-    def __init__(self, qiskit_result):
+    def __init__(self, qiskit_result, sparse: bool = None):
         self._result = qiskit_result
+        self._sparse = sparse
 
     def get_counts(self, experiment=None):
         original_counts = self._result.get_counts(experiment)
@@ -53,6 +95,12 @@ class ResultOrderedCounts:
             return original_counts
         bit_length = len(next(iter(original_counts)))
 
+        sparse = self._sparse
+        if sparse is None:
+            sparse = bit_length > MAX_DENSE_COUNTS_BITS
+        if sparse == True:
+            return SparseCounts.from_dict(original_counts, bit_length)
+
         ordered_counts = {}
         for bitstring_idx in range(2**bit_length):
             bitstring = format(bitstring_idx, f'0{bit_length}b')
@@ -70,10 +118,15 @@ class SimulatorJob(AerJob):
     Quantum Inspire SDK handles it. This facilitates documentation
     and integration with the StoreProjectRecord class from the
     data_handling module.
+
+    If recorded_circuits is set, e.g. to the circuits before the delay
+    noise was applied by the NoisySimulator class, these are recorded in
+    circuits_run_data instead of the simulated circuits.
     """
 
     def __init__(self, backend, job_id, fn, circuits=None, parameter_binds=None, run_options=None, executor=None):
         self.program_name = circuits[0].name
+        self.recorded_circuits = None
         super().__init__(backend, job_id, fn, circuits, parameter_binds, run_options, executor)
 
     def result(self,
@@ -81,23 +134,275 @@ class SimulatorJob(AerJob):
         result = super().result(timeout)
         if self._run_options.get('memory', False) == False:
             result = ResultOrderedCounts(result)
-        self.circuits_run_data = [
-            circuit_run_data(
-                circuit = circuit,
-                job_id=self.job_id(),
-                results = job_result_data(
-                    created_on=datetime.now(),
-                    job_id=self.job_id(),
-                    shots_requested=self._run_options['shots'],
-                    shots_done=self._run_options['shots'],
-                    results=result.get_counts(idx),
-                    raw_data=result.get_memory(idx) if self._run_options.get('memory', False) else None,
-                )
+        self.circuits_run_data = create_circuits_run_data(self.job_id(),
+                                                          self.recorded_circuits or self.circuits(),
+                                                          result,
+                                                          self._run_options['shots'],
+                                                          self._run_options.get('memory', False))
+        return result
+
+def create_circuits_run_data(job_id: str,
+                             circuits: list,
+                             result,
+                             shots: int,
+                             memory: bool):
+    """
+    This function creates the circuits_run_data of a simulator job, similar to
+    the one of a QIJob object, from the result of the job.
+
+    Args:
+        job_id (str):
+            The Job ID of the simulator job.
+
+        circuits (list):
+            The circuits to be recorded, in the order of the experiments of the result.
+
+        result:
+            The result of the simulator job.
+
+        shots (int):
+            The number of shots of each circuit.
+
+        memory (bool):
+            A flag for whether the raw data shots were stored.
+    """
+
+    return [
+        circuit_run_data(
+            circuit = circuit,
+            job_id=job_id,
+            results = job_result_data(
+                created_on=datetime.now(),
+                job_id=job_id,
+                shots_requested=shots,
+                shots_done=shots,
+                results=result.get_counts(idx),
+                raw_data=result.get_memory(idx) if memory else None,
             )
-            for idx, circuit in enumerate(self.circuits())
-        ]
+        )
+        for idx, circuit in enumerate(circuits)
+    ]
+
+_shard_simulator = None
+_shard_executors = weakref.WeakSet()
+
+def shutdown_shard_workers():
+    """
+    This function shuts down the pools of worker processes of the sharded execution
+    mode of all NoisySimulator objects (see NoisySimulator.shutdown_workers). It is
+    registered to run at interpreter exit.
+    """
+
+    for shard_executor in list(_shard_executors):
+        shard_executor.shutdown()
+    _shard_executors.clear()
+
+atexit.register(shutdown_shard_workers)
+
+def initialize_shard_worker(noise_model):
+    """
+    This function initializes a worker process of the sharded execution mode of the
+    NoisySimulator class with a single-threaded Aer simulator, so that the workers
+    do not compete with each other for the CPU cores.
+
+    Args:
+        noise_model (NoiseModel):
+            The noise model of the NoisySimulator, or None for ideal simulation.
+    """
+
+    global _shard_simulator
+    _shard_simulator = AerSimulator(noise_model=noise_model,
+                                    max_parallel_threads=1)
+
+def run_circuit_shard(qc: QuantumCircuit,
+                      shots: int,
+                      memory: bool,
+                      seed_simulator: int):
+    """
+    This function simulates a single shard, i.e. a number of shots of a single
+    (already transpiled) circuit, within a worker process, and returns the
+    experiment result dictionary, containing the counts (and memory) in hex format.
+
+    Args:
+        qc (QuantumCircuit):
+            The quantum circuit object.
+
+        shots (int):
+            The number of shots of the shard.
+
+        memory (bool):
+            A flag for also returning the raw data shots.
+
+        seed_simulator (int):
+            The seed of the shard.
+    """
+
+    result = _shard_simulator.run(qc,
+                                  shots = shots,
+                                  memory = memory,
+                                  seed_simulator = seed_simulator).result()
+    return result.to_dict()['results'][0]
+
+class ShardedSimulatorJob(JobV1):
+    """
+    Job class of the sharded execution mode of the NoisySimulator class, in which
+    the shots of each circuit are split into shards that are simulated in a pool
+    of worker processes. Upon job.result(), the counts and raw data of all shards
+    are merged back (in shard order) into a single result per circuit, while the
+    job object obtains the same circuits_run_data as a SimulatorJob object.
+    """
+
+    def __init__(self,
+                 backend,
+                 job_id: str,
+                 circuits: list,
+                 shard_futures: list,
+                 shard_circuit_indices: list,
+                 shots: int,
+                 memory: bool):
+        self.program_name = circuits[0].name
+        self.recorded_circuits = None
+        self._circuits = circuits
+        self._shard_futures = shard_futures
+        self._shard_circuit_indices = shard_circuit_indices
+        self._shots = shots
+        self._memory = memory
+        self._result = None
+        super().__init__(backend, job_id)
+
+    def submit(self):
+        raise RuntimeError("The shards of a ShardedSimulatorJob are submitted upon its creation.")
+
+    def circuits(self):
+        return self._circuits
+
+    def status(self):
+        if not all(shard_future.done() for shard_future in self._shard_futures):
+            return JobStatus.RUNNING
+        if any(shard_future.exception() is not None for shard_future in self._shard_futures):
+            return JobStatus.ERROR
+        return JobStatus.DONE
+
+    def result(self,
+               timeout: float = None):
+        if self._result is not None:
+            return self._result
+        _, not_done = wait(self._shard_futures, timeout=timeout)
+        if len(not_done) > 0:
+            raise TimeoutError(f"{len(not_done)} out of {len(self._shard_futures)} shards did not finish in time.")
+
+        experiment_results = [None] * len(self._circuits)
+        for shard_future, circuit_idx in zip(self._shard_futures, self._shard_circuit_indices):
+            shard_result = shard_future.result()
+            experiment_result = experiment_results[circuit_idx]
+            if experiment_result is None:
+                experiment_results[circuit_idx] = copy.deepcopy(shard_result)
+                continue
+            experiment_result['shots'] += shard_result['shots']
+            for hex_key, count in shard_result['data']['counts'].items():
+                experiment_result['data']['counts'][hex_key] = experiment_result['data']['counts'].get(hex_key, 0) + count
+            if self._memory == True:
+                experiment_result['data']['memory'] += shard_result['data']['memory']
+
+        result = Result.from_dict({
+            'backend_name': self.backend().name,
+            'backend_version': self.backend().backend_version,
+            'job_id': self.job_id(),
+            'qobj_id': self.job_id(),
+            'success': True,
+            'results': experiment_results
+        })
+        if self._memory == False:
+            result = ResultOrderedCounts(result)
+        self.circuits_run_data = create_circuits_run_data(self.job_id(),
+                                                          self.recorded_circuits or self.circuits(),
+                                                          result,
+                                                          self._shots,
+                                                          self._memory)
+        self._result = result
         return result
 
+def terminal_measurement_map(qc: QuantumCircuit):
+    """
+    This function checks whether all measurements of a quantum circuit are terminal,
+    i.e. whether no operation acts on a qubit after it has been measured, each qubit
+    and each classical bit being measured at most once, and returns the list of
+    (qubit index, classical bit index) pairs of the measurements, sorted by the
+    classical bit index. If the circuit is not a terminal-measurement circuit, or
+    it contains no measurements, the function returns None.
+
+    Args:
+        qc (QuantumCircuit):
+            The quantum circuit object.
+    """
+
+    measurement_map = {}
+    measured_qubits = set()
+    for instruction in qc.data:
+        qubit_indices = [qc.find_bit(qubit).index for qubit in instruction.qubits]
+        if instruction.operation.name == 'barrier':
+            continue
+        if instruction.operation.name == 'measure':
+            qubit_idx = qubit_indices[0]
+            clbit_idx = qc.find_bit(instruction.clbits[0]).index
+            if qubit_idx in measured_qubits or clbit_idx in measurement_map:
+                return None
+            measured_qubits.add(qubit_idx)
+            measurement_map[clbit_idx] = qubit_idx
+        elif len(instruction.clbits) > 0 or getattr(instruction.operation, 'blocks', ()) \
+                or getattr(instruction.operation, 'condition', None) is not None \
+                or any(qubit_idx in measured_qubits for qubit_idx in qubit_indices):
+            return None
+
+    if len(measurement_map) == 0:
+        return None
+    return [(measurement_map[clbit_idx], clbit_idx) for clbit_idx in sorted(measurement_map)]
+
+class ExactSamplingJob(ShardedSimulatorJob):
+    """
+    Job class of the exact sampling mode of the NoisySimulator class, in which the
+    exact noisy output distribution of each terminal-measurement circuit is computed
+    once and all of its shots are drawn from it at once. The experiment results are
+    computed upon the creation of the job, while the exact output distributions
+    remain available through the probabilities instance method.
+    """
+
+    def __init__(self,
+                 backend,
+                 job_id: str,
+                 circuits: list,
+                 experiment_results: list,
+                 probabilities: list,
+                 shots: int,
+                 memory: bool):
+        experiment_futures = []
+        for experiment_result in experiment_results:
+            experiment_future = Future()
+            experiment_future.set_result(experiment_result)
+            experiment_futures.append(experiment_future)
+        self._probabilities = probabilities
+        super().__init__(backend, job_id, circuits, experiment_futures,
+                         list(range(len(circuits))), shots, memory)
+
+    def probabilities(self,
+                      experiment: int = None):
+        """
+        This instance method returns the exact output distribution of a circuit,
+        as a dictionary of bitstrings (in the 'cK-1...c0' convention, containing
+        only the outcomes of non-zero probability) and their probabilities.
+
+        Args:
+            experiment (int):
+                The index of the circuit within the job. Defaults to None, in
+                which case the job must contain a single circuit.
+        """
+
+        if experiment is None:
+            if len(self._probabilities) > 1:
+                raise ValueError("The job contains multiple circuits, please specify the experiment index.")
+            experiment = 0
+        return dict(self._probabilities[experiment])
+
 class NoisySimulator(AerSimulator):
     """
     Class for creating a noisy (or noiseless) Aer simulator that mimics
@@ -105,6 +410,12 @@ class NoisySimulator(AerSimulator):
     and returns job data/metadata. The class is intended to be used for development
     purposes whenever all hardware of Quantum Inspire become momentarily
     unavailable for use.
+
+    The simulator can also be used as a context manager, which shuts down the pool
+    of worker processes of the sharded execution mode (if any) upon exit.
+
+    The noise model of the simulator is shared among all simulators of the same
+    backend and noise settings (see get_noise_model), hence it must not be modified.
     """
     
     def __init__(self,
@@ -116,7 +427,8 @@ class NoisySimulator(AerSimulator):
                      'readout_T1_T2': True,
                      'readout_assignment': True,
                      'CZ_depolarization': True
-                 }):
+                 },
+                 noise_model_cache_directory: str = None):
         """
         Args:
             backend_name (str):
@@ -130,25 +442,37 @@ class NoisySimulator(AerSimulator):
             noise_applied (dict):
                 A dictionary in which individual noise models can be selected
                 to be applied. By default, all noise models are applied.
+
+            noise_model_cache_directory (str):
+                The (trusted) directory path in which the noise models are cached on disk
+                (see get_noise_model). Defaults to None, in which case they are
+                only cached in memory.
         """
         
-        device_simulation_path = os.path.dirname(os.path.abspath(__file__))
-        json_path = os.path.join(device_simulation_path, 'backend_parameters.json')
-        with open(json_path, 'r') as file:
-            simulator_specs = json.load(file)[backend_name]
+        simulator_specs = load_simulator_specs(backend_name)
             
         self.basis_gates = simulator_specs['Native operations']
         coupling_map = transpiler.CouplingMap(simulator_specs['Coupling map'])
         if ideal_simulation == False:
-            self.noise_model = create_noise_model(simulator_specs,
-                                                  noise_applied)
+            self.noise_model = get_noise_model(simulator_specs,
+                                               noise_applied,
+                                               backend_name,
+                                               noise_model_cache_directory)
         else:
             self.noise_model = None
+        self.simulator_specs = simulator_specs
+        self.ideal_simulation = ideal_simulation
+        self.noise_applied = dict(noise_applied)
+        self.delay_noise_applied = ideal_simulation == False and noise_applied['delay_T1_T2'] == True
+        self.delay_errors = {}
         super().__init__(n_qubits = simulator_specs['Qubit register'],
                          basis_gates = self.basis_gates,
                          coupling_map = coupling_map,
                          noise_model = self.noise_model)
         
+        self.shard_executor = None
+        self.shard_executor_workers = None
+        self.exact_simulator = None
         self.name = backend_name
         self.description = f'A custom C++ Qasm simulator of {backend_name}'
         self.options.shots = simulator_specs['Default shots']
@@ -189,31 +513,359 @@ class NoisySimulator(AerSimulator):
             return qc_list
         else:
             return apply_delay_unpacking(qc)
+
+    def get_delay_error(self,
+                        qubit_idx: int,
+                        delay_duration_in_seconds: float):
+        """
+        This instance method returns the relaxation and pure dephasing error channel
+        of a qubit for a delay operation of a given duration, which is cached so that
+        it is instantiated only once per qubit and distinct delay duration.
+
+        Args:
+            qubit_idx (int):
+                The index of the qubit.
+
+            delay_duration_in_seconds (float):
+                The duration of the delay operation in seconds.
+        """
+
+        delay_error_key = (qubit_idx, delay_duration_in_seconds)
+        if delay_error_key not in self.delay_errors:
+            self.delay_errors[delay_error_key] = thermal_relaxation_qubit_error(self.simulator_specs,
+                                                                                qubit_idx,
+                                                                                delay_duration_in_seconds)
+        return self.delay_errors[delay_error_key]
+
+    def apply_delay_noise(self,
+                          qc: Union[QuantumCircuit, List[QuantumCircuit]]):
+        """
+        This instance method replaces each delay operation of (N * dt) duration
+        with the relaxation and pure dephasing error channel of the qubit for the
+        whole (N * dt) duration. This is identical to applying the noise on each of
+        the [N * (1 * dt)] unpacked delay operations (see unpack_qc_delays), but the
+        simulation cost no longer depends on the delay duration.
+
+        Args:
+            qc (QuantumCircuit or List[QuantumCircuit]):
+            The quantum circuit object. Can also be a list containing
+            multiple quantum circuits.
+        """
+
+        num_noisy_qubits = len(self.simulator_specs['Qubits'])
+
+        def apply_delay_errors(qc: QuantumCircuit):
+            qc_new = qc.copy_empty_like()
+            for instruction in qc.data:
+                qubit_idx = qc.find_bit(instruction.qubits[0]).index if instruction.qubits else None
+                if instruction.operation.name == 'delay' and qubit_idx < num_noisy_qubits:
+                    delay_duration = instruction.operation.duration
+                    if instruction.operation.unit == 'dt':
+                        delay_duration_in_seconds = delay_duration * self.simulator_specs['Delay duration [s]']
+                    else:
+                        delay_duration_in_seconds = apply_prefix(delay_duration, instruction.operation.unit)
+                    if delay_duration_in_seconds > 0:
+                        qc_new.append(self.get_delay_error(qubit_idx, delay_duration_in_seconds).to_instruction(),
+                                      instruction.qubits)
+                else:
+                    qc_new.append(instruction)
+            return qc_new
+
+        if type(qc) == list:
+            return [apply_delay_errors(circuit) for circuit in qc]
+        else:
+            return apply_delay_errors(qc)
             
     def run(self,
             qc: Union[QuantumCircuit, List[QuantumCircuit]],
             shots: int,
-            memory: bool = False):
+            memory: bool = False,
+            max_workers: int = None,
+            shots_per_shard: int = None,
+            seed_simulator: int = None,
+            exact_sampling: bool = False):
+        """
+        This instance method runs the quantum circuit(s) on the simulator.
+
+        Args:
+            qc (QuantumCircuit or List[QuantumCircuit]):
+                The quantum circuit object. Can also be a list containing
+                multiple quantum circuits.
+
+            shots (int):
+                The number of shots of each circuit.
+
+            memory (bool):
+                A flag for storing the raw data shots.
+
+            max_workers (int):
+                If larger than 1, the shots of each circuit are split into shards which
+                are simulated in a pool of max_workers (single-threaded) worker processes
+                (see ShardedSimulatorJob). The pool is kept alive for subsequent runs,
+                until shutdown_workers is called, the simulator context is exited or
+                the interpreter exits. Since the workers are spawned, they re-import the
+                __main__ module, hence scripts using max_workers must guard their entry
+                point with if __name__ == '__main__':
+                Defaults to None, in which case a single Aer job is submitted.
+
+            shots_per_shard (int):
+                The maximum number of shots per shard, which requires max_workers to be
+                larger than 1. Defaults to None, in which case the shots of each circuit
+                are split so that all workers are occupied.
+
+            seed_simulator (int):
+                The seed of the simulation. In the sharded execution mode, a distinct
+                seed is derived deterministically for each shard, so that the results
+                are reproducible for the same seed and shard layout.
+
+            exact_sampling (bool):
+                A flag for computing the exact noisy output distribution of each circuit
+                once, with density matrix simulation, and drawing all shots from it at
+                once, so that the run time does not depend on the number of shots
+                (see run_exact). This requires terminal-measurement circuits (see
+                terminal_measurement_map) with at most EXACT_SAMPLING_MAX_QUBITS active
+                qubits, and it cannot be combined with the sharded execution mode.
+                Defaults to False.
+        """
         
         # Force internal compilation according to simulator basis gates
         # and coupling map
-        transpiled_qc = transpile(qc,
-                                  backend = self,
-                                  layout_method = "trivial",
-                                  routing_method = "none",
-                                  optimization_level = 0,
-                                  basis_gates = self.basis_gates)
+        transpiled_qc = transpile_cached(qc,
+                                         backend = self,
+                                         layout_method = "trivial",
+                                         routing_method = "none",
+                                         optimization_level = 0,
+                                         basis_gates = self.basis_gates)
         
         # The line below ensures that noise during the delay operation
-        # is applied correctly
-        transpiled_qc = self.unpack_qc_delays(transpiled_qc)
+        # is applied correctly, for the whole duration of each delay
+        simulated_qc = transpiled_qc
+        if self.delay_noise_applied == True:
+            simulated_qc = self.apply_delay_noise(transpiled_qc)
         
-        return super().run(transpiled_qc,
-                           noise_model=self.noise_model,
-                           optimization_level = 0,
-                           shots = shots,
-                           memory = memory)
+        simulated_qc_list = simulated_qc if type(simulated_qc) == list else [simulated_qc]
+        if shots_per_shard is not None and (max_workers is None or max_workers <= 1) and exact_sampling == False:
+            raise ValueError("shots_per_shard requires the sharded execution mode, i.e. max_workers larger than 1.")
+        if exact_sampling == True:
+            if (max_workers is not None and max_workers > 1) or shots_per_shard is not None:
+                raise ValueError("Exact sampling cannot be combined with the sharded execution mode "
+                                 "(max_workers, shots_per_shard).")
+            measurement_maps = [terminal_measurement_map(circuit) for circuit in simulated_qc_list]
+            if any(measurement_map is None for measurement_map in measurement_maps) \
+                    or any(self.count_active_qubits(circuit) > EXACT_SAMPLING_MAX_QUBITS for circuit in simulated_qc_list):
+                raise ValueError(f"Exact sampling requires circuits whose measurements are all terminal, "
+                                 f"with at most {EXACT_SAMPLING_MAX_QUBITS} active qubits.")
+            job = self.run_exact(simulated_qc_list, measurement_maps, shots, memory, seed_simulator)
+        elif max_workers is not None and max_workers > 1:
+            job = self.run_sharded(simulated_qc_list,
+                                   shots, memory, max_workers, shots_per_shard, seed_simulator)
+        else:
+            seed_options = {} if seed_simulator is None else {'seed_simulator': seed_simulator}
+            job = super().run(simulated_qc,
+                              noise_model=self.noise_model,
+                              optimization_level = 0,
+                              shots = shots,
+                              memory = memory,
+                              **seed_options)
+        # the error channel instructions cannot be exported to (c)QASM, hence the job
+        # records the circuits before the delay noise was applied
+        job.recorded_circuits = transpiled_qc if type(transpiled_qc) == list else [transpiled_qc]
+        return job
     
+    def count_active_qubits(self,
+                            qc: QuantumCircuit):
+        """
+        This instance method returns the number of qubits of a quantum circuit
+        on which at least one (non-barrier) operation acts.
+
+        Args:
+            qc (QuantumCircuit):
+                The quantum circuit object.
+        """
+
+        active_qubits = set()
+        for instruction in qc.data:
+            if instruction.operation.name != 'barrier':
+                active_qubits.update(instruction.qubits)
+        return len(active_qubits)
+
+    def get_readout_channels(self,
+                             qubit_idx: int):
+        """
+        This instance method returns the measurement relaxation and pure dephasing
+        error channel of a qubit (or None), applied before its measurement, and its
+        readout assignment matrix P(declared | prepared) (or None), as these are
+        applied by the noise model of the simulator.
+
+        Args:
+            qubit_idx (int):
+                The index of the qubit.
+        """
+
+        if self.ideal_simulation == True or qubit_idx >= len(self.simulator_specs['Qubits']):
+            return None, None
+
+        measurement_error = None
+        if self.noise_applied['readout_T1_T2'] == True:
+            measurement_error = self.get_delay_error(qubit_idx, self.simulator_specs['Measurement duration [s]'])
+
+        assignment_matrix = None
+        if self.noise_applied['readout_assignment'] == True:
+            qubit_name = list(self.simulator_specs['Qubits'])[qubit_idx]
+            ssro = self.simulator_specs['Qubits'][qubit_name]['SSRO']
+            assignment_matrix = np.array([[1 - ssro['p1given0'], ssro['p1given0']],
+                                          [ssro['p0given1'], 1 - ssro['p0given1']]])
+        return measurement_error, assignment_matrix
+
+    def run_exact(self,
+                  circuits: list,
+                  measurement_maps: list,
+                  shots: int,
+                  memory: bool,
+                  seed_simulator: int = None):
+        """
+        This instance method computes the exact noisy output distribution of each
+        (already transpiled) terminal-measurement circuit, draws all of its shots
+        with a single multinomial (or, if memory is True, a single categorical)
+        sample and returns an ExactSamplingJob object (see run).
+
+        The measurements are replaced by the measurement relaxation and pure dephasing
+        error channels, after which the probabilities of the measured qubits are saved
+        with density matrix simulation, and the readout assignment matrices are then
+        applied on the resulting distribution.
+        """
+
+        if self.exact_simulator is None:
+            self.exact_simulator = AerSimulator(method = 'density_matrix',
+                                                noise_model = self.noise_model)
+
+        probability_circuits = []
+        for circuit, measurement_map in zip(circuits, measurement_maps):
+            probability_circuit = circuit.copy_empty_like()
+            for instruction in circuit.data:
+                if instruction.operation.name != 'measure':
+                    probability_circuit.append(instruction)
+                    continue
+                measurement_error, _ = self.get_readout_channels(circuit.find_bit(instruction.qubits[0]).index)
+                if measurement_error is not None:
+                    probability_circuit.append(measurement_error.to_instruction(), instruction.qubits)
+            probability_circuit.save_probabilities([qubit_idx for qubit_idx, _ in measurement_map])
+            probability_circuits.append(probability_circuit)
+
+        density_matrix_result = self.exact_simulator.run(probability_circuits,
+                                                         optimization_level = 0).result()
+        density_matrix_result = density_matrix_result.to_dict()['results']
+
+        rng = np.random.default_rng(seed_simulator)
+        experiment_results = []
+        probabilities_list = []
+        for circuit, measurement_map, circuit_result in zip(circuits, measurement_maps, density_matrix_result):
+            num_measured_qubits = len(measurement_map)
+            # tensor axis (num_measured_qubits - 1 - bit_idx) holds the outcome of measured bit_idx
+            probabilities = np.asarray(circuit_result['data']['probabilities']).reshape((2,) * num_measured_qubits)
+            for bit_idx, (qubit_idx, _) in enumerate(measurement_map):
+                _, assignment_matrix = self.get_readout_channels(qubit_idx)
+                if assignment_matrix is not None:
+                    axis = num_measured_qubits - 1 - bit_idx
+                    probabilities = np.moveaxis(np.tensordot(assignment_matrix, probabilities, axes=([0], [axis])), 0, axis)
+            probabilities = probabilities.reshape(-1)
+            # discards the round-off residues of the density matrix simulation
+            probabilities[probabilities < 1e-15] = 0
+            probabilities = probabilities / probabilities.sum()
+
+            outcomes = np.zeros(2**num_measured_qubits, dtype=np.int64)
+            for bit_idx, (_, clbit_idx) in enumerate(measurement_map):
+                outcomes |= ((np.arange(2**num_measured_qubits) >> bit_idx) & 1) << clbit_idx
+
+            experiment_data = {}
+            if memory == True:
+                shot_outcomes = rng.choice(len(probabilities), size=shots, p=probabilities)
+                shot_counts = np.bincount(shot_outcomes, minlength=len(probabilities))
+                experiment_data['memory'] = [hex(outcome) for outcome in outcomes[shot_outcomes]]
+            else:
+                shot_counts = rng.multinomial(shots, probabilities)
+            experiment_data['counts'] = {hex(outcomes[outcome_idx]): int(shot_counts[outcome_idx])
+                                         for outcome_idx in np.flatnonzero(shot_counts)}
+
+            experiment_results.append({'shots': shots,
+                                       'success': True,
+                                       'data': experiment_data,
+                                       'meas_level': 2,
+                                       'header': circuit_result['header'],
+                                       'status': 'DONE',
+                                       'seed_simulator': seed_simulator})
+            probabilities_list.append({format(outcomes[outcome_idx], f'0{circuit.num_clbits}b'): float(probabilities[outcome_idx])
+                                       for outcome_idx in np.flatnonzero(probabilities)})
+
+        return ExactSamplingJob(self, str(uuid.uuid4()), circuits, experiment_results, probabilities_list,
+                                shots, memory)
+
+    def run_sharded(self,
+                    circuits: list,
+                    shots: int,
+                    memory: bool,
+                    max_workers: int,
+                    shots_per_shard: int = None,
+                    seed_simulator: int = None):
+        """
+        This instance method splits the shots of each (already transpiled) circuit
+        into shards, submits them to the pool of worker processes and returns a
+        ShardedSimulatorJob object (see run).
+        """
+
+        if shots < 1:
+            raise ValueError(f"The number of shots must be at least 1, got {shots}.")
+        if shots_per_shard is not None and shots_per_shard < 1:
+            raise ValueError(f"The number of shots per shard must be at least 1, got {shots_per_shard}.")
+
+        if self.shard_executor is None or self.shard_executor_workers != max_workers:
+            self.shutdown_workers()
+            # spawned, since forking a process which has already initialized OpenMP may deadlock
+            self.shard_executor = ProcessPoolExecutor(max_workers=max_workers,
+                                                      mp_context=multiprocessing.get_context('spawn'),
+                                                      initializer=initialize_shard_worker,
+                                                      initargs=(self.noise_model,))
+            self.shard_executor_workers = max_workers
+            _shard_executors.add(self.shard_executor)
+
+        if shots_per_shard is None:
+            shards_per_circuit = max(1, math.ceil(max_workers / len(circuits)))
+            shots_per_shard = math.ceil(shots / shards_per_circuit)
+        shard_shots = [shots_per_shard] * (shots // shots_per_shard)
+        if shots % shots_per_shard > 0:
+            shard_shots.append(shots % shots_per_shard)
+
+        seed_sequences = np.random.SeedSequence(seed_simulator).spawn(len(circuits) * len(shard_shots))
+        shard_futures = []
+        shard_circuit_indices = []
+        for circuit_idx, circuit in enumerate(circuits):
+            for shard_idx, num_shard_shots in enumerate(shard_shots):
+                shard_seed = int(seed_sequences[circuit_idx*len(shard_shots) + shard_idx].generate_state(1)[0])
+                shard_futures.append(self.shard_executor.submit(run_circuit_shard, circuit, num_shard_shots,
+                                                                memory, shard_seed))
+                shard_circuit_indices.append(circuit_idx)
+
+        return ShardedSimulatorJob(self, str(uuid.uuid4()), circuits, shard_futures, shard_circuit_indices,
+                                   shots, memory)
+
+    def shutdown_workers(self):
+        """
+        This instance method shuts down the pool of worker processes of the
+        sharded execution mode, if any.
+        """
+
+        if self.shard_executor is not None:
+            self.shard_executor.shutdown()
+            _shard_executors.discard(self.shard_executor)
+            self.shard_executor = None
+            self.shard_executor_workers = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.shutdown_workers()
+
     def _run_circuits(self, circuits, parameter_binds, **run_options):
         # Submit job
         job_id = str(uuid.uuid4())
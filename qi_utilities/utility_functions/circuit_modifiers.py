@@ -89,8 +89,29 @@ def apply_pre_measurement_rotations(qc: QuantumCircuit,
 
     return qc
 
+def get_ro_register_length(num_qubits: int,
+                           mode: str = 'full'):
+    """
+    This function returns the number of classical bits which apply_readout_circuit
+    appends to a quantum circuit, for a given number of qubits.
+
+    Args:
+        num_qubits (int):
+            The number of qubits on which the readout circuit is applied.
+
+        mode (str):
+            The readout calibration mode (see apply_readout_circuit).
+    """
+
+    if mode == 'full':
+        return num_qubits * 2**num_qubits
+    elif mode == 'tensored':
+        return num_qubits * 2
+    raise ValueError(f"Unknown readout calibration mode '{mode}'. Choose between 'full' and 'tensored'.")
+
 def apply_readout_circuit(qc: QuantumCircuit,
-                          qubit_list: list):
+                          qubit_list: list,
+                          mode: str = 'full'):
     """
     This function appends a QuantumCircuit object with a quantum circuit
     containing mid-circuit measurements which are used in post-processing
@@ -107,14 +128,27 @@ def apply_readout_circuit(qc: QuantumCircuit,
             readout circuit on.
             e.g. qubit_list = [0, 2] will apply the readout circuit on
             qubits q0 and q2.
+
+        mode (str):
+            The readout calibration mode.
+            * 'full': all 2**n basis states are prepared and measured, appending
+              n * 2**n classical bits, so that the full readout assignment matrix
+              can be extracted.
+            * 'tensored': only the states |0...0> and |1...1> are prepared and measured,
+              appending 2 * n classical bits, so that a 2x2 readout assignment matrix
+              can be extracted for each qubit individually.
     """
 
     num_qubits = len(qubit_list)
-    readout_circuit = QuantumCircuit(qc.num_qubits, qc.num_clbits + num_qubits * 2**num_qubits, name=qc.name)
+    ro_register_length = get_ro_register_length(num_qubits, mode)
+    readout_circuit = QuantumCircuit(qc.num_qubits, qc.num_clbits + ro_register_length, name=qc.name)
 
     binary_list = []
-    for binary_str_idx in range(2**num_qubits):
-        binary_list.append(np.binary_repr(binary_str_idx, num_qubits))
+    if mode == 'full':
+        for binary_str_idx in range(2**num_qubits):
+            binary_list.append(np.binary_repr(binary_str_idx, num_qubits))
+    else:
+        binary_list = ['0' * num_qubits, '1' * num_qubits]
 
     for binary_str_idx in range(len(binary_list)):
 
@@ -134,6 +168,80 @@ def apply_readout_circuit(qc: QuantumCircuit,
         readout_circuit.barrier()
 
     qc.barrier()
-    additional_bits = ClassicalRegister(num_qubits * 2**num_qubits)
+    additional_bits = ClassicalRegister(ro_register_length)
+    qc.add_bits(additional_bits)
+    return readout_circuit.compose(qc, front=True)
+
+def apply_multi_group_readout_circuit(qc: QuantumCircuit,
+                                      qubit_groups: list[list]):
+    """
+    This function appends a QuantumCircuit object with a quantum circuit
+    containing mid-circuit measurements which are used in post-processing
+    for constructing a separate readout assignment matrix for each of several
+    disjoint groups of qubits (see extract_ro_assignment_matrices).
+
+    Contrary to applying apply_readout_circuit on each group one after another,
+    the basis states of all groups are prepared and measured simultaneously in
+    shared measurement blocks, so that only 2**k blocks are needed, k being
+    the size of the largest group.
+
+    The appended classical bits follow the layout expected by
+    extract_ro_assignment_matrices (and used by measure_ro_assignment_matrices),
+    i.e. each group of qubit_groups occupies len(group) * 2**len(group) consecutive
+    bits, with the first group occupying the leftmost bits in the bitstrings,
+    followed by the second group, and so on. Within the bits of a group, the
+    measurement block of each basis state occupies len(group) bits, in the same
+    order as for apply_readout_circuit on that group alone.
+
+    Args:
+        qc (QuantumCircuit):
+            The quantum circuit object.
+
+        qubit_groups (list(list)):
+            An ordered list of lists containing disjoint groups of qubits.
+            e.g. qubit_groups = [[0, 2], [1, 3]].
+    """
+
+    flattened_qubits = [qubit_idx for qubit_list in qubit_groups for qubit_idx in qubit_list]
+    if len(set(flattened_qubits)) != len(flattened_qubits):
+        raise ValueError(f"Qubit groups {qubit_groups} must be disjoint.")
+
+    group_register_lengths = [get_ro_register_length(len(qubit_list)) for qubit_list in qubit_groups]
+    ro_register_length = sum(group_register_lengths)
+    readout_circuit = QuantumCircuit(qc.num_qubits, qc.num_clbits + ro_register_length, name=qc.name)
+
+    # the first group occupies the most significant bits of the appended register
+    group_start_bits = []
+    for group_idx in range(len(qubit_groups)):
+        group_start_bits.append(qc.num_clbits + ro_register_length - sum(group_register_lengths[:group_idx+1]))
+
+    max_group_size = max(len(qubit_list) for qubit_list in qubit_groups)
+    for binary_str_idx in range(2**max_group_size):
+
+        measured_qubits = []
+        measured_clbits = []
+        for qubit_list, start_bit in zip(qubit_groups, group_start_bits):
+            num_qubits = len(qubit_list)
+            if binary_str_idx >= 2**num_qubits:
+                continue
+
+            for qubit_idx in qubit_list:
+                readout_circuit.reset(qubit_idx)
+
+            reversed_binary_string = np.binary_repr(binary_str_idx, num_qubits)[::-1]
+            for idx in range(len(reversed_binary_string)):
+                if reversed_binary_string[idx] == '1':
+                    readout_circuit.x(qubit_list[idx])
+
+            measured_qubits += list(qubit_list)
+            measured_clbits += list(range(start_bit + binary_str_idx*num_qubits,
+                                          start_bit + (binary_str_idx+1)*num_qubits))
+        readout_circuit.barrier()
+
+        readout_circuit.measure(measured_qubits, measured_clbits)
+        readout_circuit.barrier()
+
+    qc.barrier()
+    additional_bits = ClassicalRegister(ro_register_length)
     qc.add_bits(additional_bits)
-    return readout_circuit.compose(qc, front=True)
\ No newline at end of file
+    return readout_circuit.compose(qc, front=True)
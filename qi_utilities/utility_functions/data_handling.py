@@ -5,16 +5,287 @@ data and metadata in a structured manner in the local user directory.
 Authors: Marios Samiotis
 """
 
+import io
+import os
+import copy
+import asyncio
 import numpy as np
+import pandas as pd
 import json
+import time
+import sqlite3
+from contextlib import closing, contextmanager
+from functools import cached_property
 import h5py
+import atexit
 import warnings
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 import matplotlib.pyplot as plt
 from pathlib import Path
 from PIL import ImageFilter
-from qiskit import qasm3
+from scipy.sparse import csr_matrix
+from qiskit import QuantumCircuit, qasm3
 from qiskit_quantuminspire.cqasm import dumps
 from qiskit_quantuminspire.qi_jobs import QIJob
+try:
+    # provided by qi-compute-api-client, on which the incremental recording of QIJob results relies
+    from compute_api_client import ApiClient, PageResult, Result as RawJobResult, ResultsApi
+    from qi2_shared.client import config
+    from qi2_shared.pagination import PageReader
+    from qi2_shared.utils import run_async
+except ImportError:
+    ApiClient = None
+from qi_utilities.utility_functions.raw_data_processing import ShotMatrix
+
+def render_circuit_figure(qc: QuantumCircuit,
+                          circuit_fig_path: str,
+                          job_timestamp: str,
+                          circuit_name: str,
+                          job_id: str,
+                          circuit_depth: int,
+                          close_figure: bool = False):
+    """
+    This function draws a quantum circuit and stores the figure as a PNG file,
+    in the format used for the project records.
+
+    It is defined at module level so that it can also be executed in a separate
+    process, since matplotlib is not thread-safe.
+
+    Args:
+        qc (QuantumCircuit):
+            The quantum circuit object.
+
+        circuit_fig_path (str):
+            The file path of the PNG file, or a binary file-like object.
+
+        job_timestamp (str):
+            The job timestamp, in the format "%Y%m%d_%H%M%S".
+
+        circuit_name (str):
+            The name of the quantum circuit.
+
+        job_id (str):
+            The Job ID.
+
+        circuit_depth (int):
+            The depth of the quantum circuit.
+
+        close_figure (bool):
+            A flag for closing the figure after storing it.
+    """
+
+    fig1 = qc.draw('mpl', scale=1.3)
+    fig1.suptitle(f'\n{job_timestamp}\nTranspiled quantum circuit\nCircuit name: {circuit_name}\nJob ID: {job_id}\n',
+                x = 0.5, y = 0.99, fontsize=16)
+    fig1.supxlabel(f'Circuit depth: {circuit_depth}', x = 0.5, y = 0.06, fontsize=18)
+    fig1.savefig(circuit_fig_path)
+    if close_figure == True:
+        plt.close(fig1)
+
+_background_figure_executor = None
+_storage_figure_executor = None
+_storage_figure_executor_workers = None
+
+def render_job_circuit_figure(job_dir: str):
+    """
+    This function renders the circuit figure of an already stored job from its
+    OpenQASM3 program and job result, and stores it as a PNG file within the job
+    directory, with the same file name as when stored directly by the
+    StoreProjectRecord class.
+
+    For jobs stored in a project HDF5 container (storage = 'hdf5'), the PNG file
+    contents are instead stored in the 'Circuit figure' dataset of the job group,
+    so the container must not be opened elsewhere in the meantime.
+
+    Args:
+        job_dir (str):
+            The job directory, as created by the StoreProjectRecord class.
+    """
+
+    record = RetrieveProjectRecord.from_job_dir(job_dir)
+    json_data = record.job_result
+
+    if json_data['Circuit depth'] < 5000: # capped so that it doesn't take forever to store large figures
+        figure_arguments = (json_data['Job timestamp'], json_data['Circuit name'],
+                            json_data['Job ID'], json_data['Circuit depth'])
+        if record.container_path is not None:
+            circuit_figure = io.BytesIO()
+            render_circuit_figure(record.qc, circuit_figure, *figure_arguments, close_figure=True)
+            with h5py.File(record.container_path, 'a') as file:
+                job_group = file['Jobs'][record.job_dir.name]
+                if 'Circuit figure' in job_group:
+                    del job_group['Circuit figure']
+                job_group.create_dataset('Circuit figure', data=np.frombuffer(circuit_figure.getvalue(), dtype=np.uint8))
+        else:
+            circuit_fig_path = record.job_dir / f"quantum_circuit_{json_data['Job timestamp']}.png"
+            render_circuit_figure(record.qc, circuit_fig_path, *figure_arguments, close_figure=True)
+
+def submit_circuit_figures(job_dirs: list):
+    """
+    This function submits the rendering of the circuit figures of already stored
+    jobs (see render_job_circuit_figure) to a background process, and returns
+    immediately a list containing the future of each rendering.
+
+    All renderings are queued in a single background process, which is shared
+    among all calls, so that the experiment loop is never blocked. The process
+    is shut down at interpreter exit, after the queued renderings have finished,
+    or earlier with shutdown_figure_workers.
+
+    Since the background process is spawned, it re-imports the __main__ module,
+    hence scripts calling this function must guard their entry point with
+    if __name__ == '__main__':
+
+    Args:
+        job_dirs (list):
+            The job directories, as created by the StoreProjectRecord class.
+    """
+
+    global _background_figure_executor
+    if _background_figure_executor is None:
+        _background_figure_executor = ProcessPoolExecutor(max_workers=1,
+                                                          mp_context=multiprocessing.get_context('spawn'))
+    return [_background_figure_executor.submit(render_job_circuit_figure, str(job_dir)) for job_dir in job_dirs]
+
+def get_storage_figure_executor(max_workers: int):
+    """
+    This function returns the pool of processes rendering the circuit figures in the
+    parallel mode of the StoreProjectRecord class. The pool is spawned only once (or
+    again whenever max_workers changes) and is shared among all project records, so
+    that the start-up cost of the processes is paid only once per session.
+
+    Args:
+        max_workers (int):
+            The number of processes of the pool.
+    """
+
+    global _storage_figure_executor, _storage_figure_executor_workers
+    if _storage_figure_executor is None or _storage_figure_executor_workers != max_workers:
+        if _storage_figure_executor is not None:
+            _storage_figure_executor.shutdown()
+        _storage_figure_executor = ProcessPoolExecutor(max_workers=max_workers,
+                                                       mp_context=multiprocessing.get_context('spawn'))
+        _storage_figure_executor_workers = max_workers
+    return _storage_figure_executor
+
+def shutdown_figure_workers(wait: bool = True):
+    """
+    This function shuts down the processes rendering the circuit figures, i.e. the
+    background process of submit_circuit_figures and the pool of processes of the
+    parallel mode of the StoreProjectRecord class, if any. It is registered to run
+    at interpreter exit.
+
+    Args:
+        wait (bool):
+            If True, the function returns only after all queued renderings have
+            finished. Otherwise, the queued renderings which have not started yet
+            are cancelled.
+    """
+
+    global _background_figure_executor, _storage_figure_executor, _storage_figure_executor_workers
+    if _background_figure_executor is not None:
+        _background_figure_executor.shutdown(wait=wait, cancel_futures=not wait)
+        _background_figure_executor = None
+    if _storage_figure_executor is not None:
+        _storage_figure_executor.shutdown(wait=wait, cancel_futures=not wait)
+        _storage_figure_executor = None
+        _storage_figure_executor_workers = None
+
+atexit.register(shutdown_figure_workers)
+
+def render_circuit_figures(job_ids: list,
+                           directory: str = None,
+                           background: bool = False):
+    """
+    This function renders on demand the circuit figures of selected already stored
+    jobs, e.g. jobs which were stored with store_circuit_figures = False or 'deferred'.
+
+    Args:
+        job_ids (list):
+            The Job IDs, as these appear also in the Quantum Inspire platform.
+
+        directory (str):
+            Specifies the directory path in which the project records are stored.
+            For no specified path, it defaults to "Documents/QuantumInspireProjects".
+
+        background (bool):
+            If True, the figures are rendered in a background process and a list
+            containing the future of each rendering is returned.
+    """
+
+    job_dirs = [RetrieveProjectRecord(job_id, directory).job_dir for job_id in job_ids]
+    if background == True:
+        return submit_circuit_figures(job_dirs)
+    for job_dir in job_dirs:
+        render_job_circuit_figure(job_dir)
+
+PROJECT_STORAGES = ['directory', 'hdf5']
+RAW_DATA_FORMATS = ['int8', 'packed']
+RAW_DATA_COMPRESSIONS = ['gzip', 'lzf', None]
+RAW_DATA_CHUNK_SHOTS = 2**14
+PARALLEL_STORAGE_MIN_JOBS = 32
+MAX_DENSE_LOAD_COUNTS_ENTRIES = 2**22
+MAX_SPARSE_LOAD_COUNTS_BITS = 62
+
+def read_raw_data(hdf5_dataset: h5py.Dataset,
+                  start: int = None,
+                  stop: int = None,
+                  columns: list = None):
+    """
+    This function reads the shots [start, stop) of an 'Experimental Data/Data'
+    HDF5 dataset, as stored by the StoreProjectRecord class, and returns them as
+    a 2D int8 array of N rows, representing each shot, and M columns, representing
+    all mid-circuit measurement outcomes (see StoreProjectRecord.store_raw_data).
+    Only the contiguous range of columns spanning the requested columns is read
+    from the file.
+
+    The raw data format is detected from the 'Format' attribute of the dataset,
+    so that bit-packed datasets are decoded transparently, while datasets stored
+    without this attribute are treated as 'int8'.
+
+    Args:
+        hdf5_dataset (h5py.Dataset):
+            The raw data HDF5 dataset.
+
+        start (int):
+            The first shot to be read. Defaults to None, i.e. the first shot.
+
+        stop (int):
+            The shot up to which (not including) the raw data is read.
+            Defaults to None, i.e. up to the last shot.
+
+        columns (list):
+            The columns, i.e. the classical bit indices, to be read, in the order in
+            which they are returned. Defaults to None, i.e. all columns.
+    """
+
+    packed = hdf5_dataset.attrs.get('Format', 'int8') == 'packed'
+    if packed:
+        num_clbits = int(hdf5_dataset.attrs['Number of classical bits'])
+    else:
+        num_clbits = hdf5_dataset.shape[1] if hdf5_dataset.ndim == 2 else 0
+
+    if columns is None:
+        raw_data = hdf5_dataset[start:stop]
+        if packed:
+            raw_data = np.unpackbits(raw_data, axis=1, count=num_clbits, bitorder='little')
+        return raw_data.astype(np.int8, copy=False)
+
+    columns = np.asarray(columns, dtype=np.int64)
+    if columns.size == 0:
+        num_shots = len(range(*slice(start, stop).indices(hdf5_dataset.shape[0])))
+        return np.zeros((num_shots, 0), dtype=np.int8)
+    if columns.min() < 0 or columns.max() >= num_clbits:
+        raise IndexError(f"Columns out of range for a bit register of size {num_clbits}.")
+
+    first_column, last_column = int(columns.min()), int(columns.max()) + 1
+    if packed:
+        first_byte, last_byte = first_column // 8, (last_column - 1) // 8 + 1
+        raw_data = np.unpackbits(hdf5_dataset[start:stop, first_byte:last_byte], axis=1, bitorder='little')
+        raw_data = raw_data[:, columns - 8*first_byte]
+    else:
+        raw_data = hdf5_dataset[start:stop, first_column:last_column][:, columns - first_column]
+    return raw_data.astype(np.int8, copy=False)
 
 class StoreProjectRecord:
     """
@@ -26,13 +297,28 @@ class StoreProjectRecord:
     regarding the backend, the quantum circuits executed, etc.
 
     It works with both the Tuna backends but also the 'QX emulator' backend.
+
+    By default, each job is stored in its own job directory, containing the job
+    result JSON file, the program files, the circuit figure and the raw data HDF5 file.
+    Alternatively (storage = 'hdf5'), all jobs are stored in a single project HDF5
+    container within the project directory, which contains one group per job,
+    i.e. Jobs/job_idx_<job_idx>__job_id_<job_id>, with the following layout:
+    * the job result metadata as group attributes,
+    * the 'Counts/Bitstrings' and 'Counts/Values' datasets,
+    * the 'OpenQASM3 program' and 'cQASM v3 program' string datasets,
+    * the 'Circuit figure' dataset, containing the PNG file contents,
+    * the 'Experimental Data/Data' raw data dataset (see store_raw_data).
     """
 
     def __init__(self,
                  job: QIJob,
                  directory: 'str' = None,
                  silent: bool = False,
-                 store_circuit_figures: bool = True):
+                 store_circuit_figures: bool | str = True,
+                 max_workers: int = None,
+                 raw_data_format: str = 'int8',
+                 raw_data_compression: str = 'gzip',
+                 storage: str = 'directory'):
         """
         Args:
             job (QIJob):
@@ -45,27 +331,106 @@ class StoreProjectRecord:
                 stored.
                 For no specified path, it defaults to "Documents/QuantumInspireProjects".
                 
-            store_circuit_figures (bool):
+            store_circuit_figures (bool | str):
                 A user-configurable flag for storing locally the circuit PNG file.
                 Useful to set to False when the circuit is too large.
+                If set to 'deferred', only the program files are stored at first, while
+                the circuit figures are rendered in a background process after the
+                project record has been stored (see submit_circuit_figures). The figures
+                of selected jobs can also be rendered later on with render_circuit_figures.
+                Since the background process is spawned, scripts using 'deferred' must
+                guard their entry point with if __name__ == '__main__':
+
+            max_workers (int):
+                The maximum number of parallel workers used for storing the jobs.
+                If larger than 1, the jobs are serialized and stored in a pool of
+                threads, while the circuit figures are rendered in a pool of processes,
+                since matplotlib is not thread-safe. The stored files are identical to
+                those of the sequential mode. The number of workers is capped to the
+                number of CPU cores, while, since spawning the processes takes a few
+                seconds, projects of fewer than PARALLEL_STORAGE_MIN_JOBS jobs are always
+                stored sequentially. The pool of processes is kept alive and reused by
+                subsequent project records (see shutdown_figure_workers). Since the
+                processes are spawned, scripts using max_workers must guard their entry
+                point with if __name__ == '__main__':
+                Defaults to None, in which case the jobs are stored one after another.
+
+            raw_data_format (str):
+                The format of the raw data HDF5 dataset, either 'int8', i.e. one byte
+                per measurement outcome, or 'packed', i.e. eight measurement outcomes
+                per byte, which reduces the disk usage and I/O by about a factor of 8.
+                Both formats are decoded transparently by the RetrieveProjectRecord class.
+
+            raw_data_compression (str):
+                The compression filter of the raw data HDF5 dataset, either 'gzip',
+                'lzf' (faster, but less compact) or None.
+
+            storage (str):
+                Either 'directory', i.e. one job directory containing several files
+                per job, or 'hdf5', i.e. a single project HDF5 container for all jobs,
+                which is much faster on network filesystems for projects with many jobs.
+                Since an HDF5 file cannot be written concurrently, the jobs are stored one
+                after another for storage = 'hdf5', while store_circuit_figures = 'deferred'
+                is not supported. Defaults to 'directory'.
         """
 
+        if raw_data_format not in RAW_DATA_FORMATS:
+            raise ValueError(f"Unknown raw data format '{raw_data_format}'. Choose one of {RAW_DATA_FORMATS}.")
+        if raw_data_compression not in RAW_DATA_COMPRESSIONS:
+            raise ValueError(f"Unknown raw data compression '{raw_data_compression}'. "
+                             f"Choose one of {RAW_DATA_COMPRESSIONS}.")
+        if storage not in PROJECT_STORAGES:
+            raise ValueError(f"Unknown storage '{storage}'. Choose one of {PROJECT_STORAGES}.")
+        if storage == 'hdf5' and store_circuit_figures == 'deferred':
+            raise ValueError("Deferred circuit figures are not supported for storage = 'hdf5'.")
+        self.raw_data_format = raw_data_format
+        self.raw_data_compression = raw_data_compression
+        self.storage = storage
+
         self.create_project_directory(job, directory)
         self.obtain_backend_metadata(job)
         self.store_project_json()
-        for job_idx in range(len(job.circuits_run_data)):
-            self.create_job_directory(job, job_idx, directory)
-            self.store_circuit_metadata(job, job_idx, store_circuit_figures)
-            self.store_job_result(job, job_idx)
-            if self.raw_data_memory == True:
-                self.store_raw_data(job, job_idx)
+        self.stored_job_records = []
+        if max_workers is not None:
+            max_workers = min(max_workers, os.cpu_count() or 1)
+        if storage == 'hdf5':
+            self.container_path = (
+                Path(self.project_dir)
+                / f"project_record_{self.date_timestamp}_{self.job_0_timestamp}.hdf5"
+            )
+            with h5py.File(self.container_path, 'w') as self.container:
+                for job_idx in range(len(job.circuits_run_data)):
+                    self.store_job(job, job_idx, directory, store_circuit_figures)
+            del self.container
+        elif max_workers is None or max_workers <= 1 or len(job.circuits_run_data) < PARALLEL_STORAGE_MIN_JOBS:
+            for job_idx in range(len(job.circuits_run_data)):
+                self.store_job(job, job_idx, directory, store_circuit_figures)
+        else:
+            figure_executor = get_storage_figure_executor(max_workers)
+            with ThreadPoolExecutor(max_workers=max_workers) as storage_executor:
+                # each job is stored by its own shallow copy, since the store methods set instance attributes
+                storage_futures = [storage_executor.submit(copy.copy(self).store_job, job, job_idx, directory,
+                                                           store_circuit_figures, figure_executor)
+                                   for job_idx in range(len(job.circuits_run_data))]
+                figure_futures = [storage_future.result() for storage_future in storage_futures]
+                for figure_future in figure_futures:
+                    if figure_future is not None:
+                        figure_future.result()
+
+        self.stored_job_records.sort(key=lambda job_record: job_record['Job index'])
+        ProjectRecordIndex(directory).add(self.stored_job_records)
+
+        if store_circuit_figures == 'deferred':
+            self.figure_futures = submit_circuit_figures([job_record['Job directory']
+                                                          for job_record in self.stored_job_records])
 
         if silent == False:
             return print(f"Successfully stored project record in the following directory:\n{str(self.project_dir)}\n")
 
     def create_project_directory(self,
                                  job: QIJob,
-                                 directory: str = None):
+                                 directory: str = None,
+                                 job_idx: int = 0):
         """
         This instance method creates a new project folder within the local user
         Documents / QuantumInspireProjects directory. If this directory does not
@@ -79,9 +444,13 @@ class StoreProjectRecord:
                 Specifies the directory path in which the project record is to be
                 stored.
                 For no specified path, it defaults to "Documents/QuantumInspireProjects".
+
+            job_idx (int):
+                The index of the job whose timestamp defines the project timestamp.
+                Defaults to 0, i.e. the first job contained within the project.
         """
 
-        timestamp_utc = job.circuits_run_data[0].results.created_on # actually when the job finished, not when created
+        timestamp_utc = job.circuits_run_data[job_idx].results.created_on # actually when the job finished, not when created
         timestamp = timestamp_utc.astimezone()
         self.date_timestamp = timestamp.strftime("%Y%m%d")
         self.job_0_timestamp = timestamp.strftime("%H%M%S")
@@ -150,6 +519,8 @@ class StoreProjectRecord:
         general_dict['Backend number of qubits'] = self.backend_num_qubits
         general_dict['Backend operations set'] = self.backend_operations
         general_dict['Backend maximum allowed shots'] = self.backend_max_shots
+        general_dict['Raw data format'] = self.raw_data_format
+        general_dict['Raw data compression'] = self.raw_data_compression
 
         file_path = (
             Path(self.project_dir)
@@ -158,6 +529,54 @@ class StoreProjectRecord:
         with open(file_path, 'w') as file:
             json.dump(general_dict, file, indent=3)
 
+    def store_job(self,
+                  job: QIJob,
+                  job_idx: int,
+                  directory: str = None,
+                  store_circuit_figures: bool = True,
+                  figure_executor: ProcessPoolExecutor = None):
+        """
+        This instance method stores the complete record of a single job contained
+        within the project, i.e. its directory, circuit metadata, result and raw data.
+
+        Args:
+            job (QIJob):
+                The user already-submitted job (project) object.
+
+            job_idx (int):
+                The job index for all jobs contained within the project.
+
+            directory (str):
+                Specifies the directory path in which the project record is to be
+                stored.
+                For no specified path, it defaults to "Documents/QuantumInspireProjects".
+
+            store_circuit_figures (bool):
+                A user-configurable flag for storing locally the circuit PNG file.
+
+            figure_executor (ProcessPoolExecutor):
+                An optional process pool in which the circuit figure is rendered.
+                Defaults to None, in which case it is rendered in the calling process.
+
+        Returns:
+            The future of the circuit figure rendering, if submitted to figure_executor.
+        """
+
+        self.create_job_directory(job, job_idx, directory)
+        figure_future = self.store_circuit_metadata(job, job_idx, store_circuit_figures, figure_executor)
+        self.store_job_result(job, job_idx)
+        if self.raw_data_memory == True:
+            self.store_raw_data(job, job_idx)
+        self.stored_job_records.append({
+            'Job directory': self.job_dir,
+            'Job ID': self.job_id,
+            'Job index': job_idx,
+            'Project name': self.project_name,
+            'Backend name': self.backend_name,
+            'Job timestamp': f"{self.date_timestamp}_{self.job_timestamp}"
+        })
+        return figure_future
+
     def create_job_directory(self,
                              job: QIJob,
                              job_idx: int,
@@ -192,6 +611,13 @@ class StoreProjectRecord:
         self.job_timestamp = timestamp.strftime("%H%M%S")
         self.job_id = job.circuits_run_data[job_idx].results.job_id
 
+        if self.storage == 'hdf5':
+            # the job group path within the container serves as the job directory of the job record
+            self.job_group = self.container.create_group(f"Jobs/job_idx_{job_idx}__job_id_{self.job_id}",
+                                                         track_order=True)
+            self.job_dir = self.container_path / f"job_idx_{job_idx}__job_id_{self.job_id}"
+            return
+
         if directory is not None:
             self.base_dir = Path(directory)
         else:
@@ -248,7 +674,18 @@ class StoreProjectRecord:
         job_result_dict['Shots requested'] = self.shots_requested
         job_result_dict['Shots done'] = self.shots_done
         job_result_dict['Raw data memory'] = self.raw_data_memory
-        job_result_dict['Counts'] = self.counts
+        job_result_dict['Counts'] = dict(self.counts)
+
+        if self.storage == 'hdf5':
+            for key, value in job_result_dict.items():
+                if key != 'Counts':
+                    self.job_group.attrs[key] = h5py.Empty("f") if value is None else value
+            self.job_group.create_dataset('Counts/Bitstrings', data=list(job_result_dict['Counts'].keys()),
+                                          dtype=h5py.string_dtype())
+            self.job_group.create_dataset('Counts/Values', data=np.array(list(job_result_dict['Counts'].values()),
+                                                                         dtype=np.int64))
+            return
+
         file_path = (
             Path(self.job_dir)
             / f"job_result_{self.date_timestamp}_{self.job_timestamp}.json"
@@ -259,7 +696,8 @@ class StoreProjectRecord:
     def store_circuit_metadata(self,
                                job: QIJob,
                                job_idx: int,
-                               store_circuit_figures: bool = True):
+                               store_circuit_figures: bool = True,
+                               figure_executor: ProcessPoolExecutor = None):
         """
         This instance method stores the job circuit metadata, i.e. bookkeeping
         records, cQASM_v3 and OpenQASM3 program files, as well as the circuit
@@ -282,6 +720,11 @@ class StoreProjectRecord:
             store_circuit_figures (bool):
                 A user-configurable flag for storing locally the circuit PNG file.
                 Useful to set to False when the circuit is too large.
+
+            figure_executor (ProcessPoolExecutor):
+                An optional process pool in which the circuit figure is rendered,
+                in which case the future of the rendering is returned.
+                Defaults to None, in which case it is rendered in the calling process.
         """
 
         self.qc = job.circuits_run_data[job_idx].circuit
@@ -292,6 +735,18 @@ class StoreProjectRecord:
 
         qasm3_program = qasm3.dumps(self.qc)
         cqasm_v3_program = dumps(self.qc)
+
+        if self.storage == 'hdf5':
+            self.job_group.create_dataset('OpenQASM3 program', data=qasm3_program, dtype=h5py.string_dtype())
+            self.job_group.create_dataset('cQASM v3 program', data=cqasm_v3_program, dtype=h5py.string_dtype())
+            if store_circuit_figures == True and self.circuit_depth < 5000:
+                circuit_figure = io.BytesIO()
+                render_circuit_figure(self.qc, circuit_figure, f"{self.date_timestamp}_{self.job_timestamp}",
+                                      self.circuit_name, self.job_id, self.circuit_depth)
+                self.job_group.create_dataset('Circuit figure',
+                                              data=np.frombuffer(circuit_figure.getvalue(), dtype=np.uint8))
+            return None
+
         qasm3_program_path = (
             Path(self.job_dir)
             / f"qasm3_program_{self.date_timestamp}_{self.job_timestamp}.qasm"
@@ -307,15 +762,16 @@ class StoreProjectRecord:
 
         if store_circuit_figures == True:
             if self.circuit_depth < 5000: # capped so that it doesn't take forever to store large figures
-                fig1 = self.qc.draw('mpl', scale=1.3)
-                fig1.suptitle(f'\n{self.date_timestamp}_{self.job_timestamp}\nTranspiled quantum circuit\nCircuit name: {self.circuit_name}\nJob ID: {self.job_id}\n',
-                            x = 0.5, y = 0.99, fontsize=16)
-                fig1.supxlabel(f'Circuit depth: {self.circuit_depth}', x = 0.5, y = 0.06, fontsize=18)
                 circuit_fig_path = (
                     Path(self.job_dir)
                     / f"quantum_circuit_{self.date_timestamp}_{self.job_timestamp}.png"
                 )
-                fig1.savefig(circuit_fig_path)
+                figure_arguments = (self.qc, circuit_fig_path, f"{self.date_timestamp}_{self.job_timestamp}",
+                                    self.circuit_name, self.job_id, self.circuit_depth)
+                if figure_executor is not None:
+                    return figure_executor.submit(render_circuit_figure, *figure_arguments, close_figure=True)
+                render_circuit_figure(*figure_arguments)
+        return None
 
     def store_raw_data(self,
                        job: QIJob,
@@ -343,6 +799,12 @@ class StoreProjectRecord:
         measurement outcome, while column M-1 represents the final measurement outcome
         for a particular measurement shot. 
 
+        For the 'packed' raw data format, each row is bit-packed along the columns
+        (in little bit order, i.e. column 0 is the least significant bit of the first
+        byte), while the dataset attributes 'Format' and 'Number of classical bits'
+        allow it to be decoded (see read_raw_data). The dataset is chunked along the
+        shots, so that chunks of shots can be streamed efficiently.
+
         Args:
             job (QIJob):
                 The user already-submitted job (project) object.
@@ -359,22 +821,742 @@ class StoreProjectRecord:
         """
 
         raw_data = job.circuits_run_data[job_idx].results.raw_data
-        job_raw_data = []
-
-        for circuit_shot_idx in range(len(raw_data)):
-
-            raw_data_row = [int(raw_data[circuit_shot_idx][digit_idx]) for digit_idx in range(len(raw_data[0]))]
-            raw_data_row_reversed = raw_data_row[::-1] # because results are printed reversed
-            job_raw_data.append(raw_data_row_reversed)
+        # parsed through a single byte buffer, reversed because results are printed reversed
+        job_raw_data = ShotMatrix.from_memory(raw_data).bits.astype(np.int8)
 
-        job_raw_data = np.array(job_raw_data, dtype=np.int8)
+        if self.storage == 'hdf5':
+            self.create_raw_data_dataset(self.job_group, job_raw_data)
+            return
 
         hdf5_file_dir = (
             Path(self.job_dir)
             / f"raw_data_{self.date_timestamp}_{self.job_timestamp}.hdf5"
         )
         with h5py.File(hdf5_file_dir, 'w') as file:
-            file.create_dataset('Experimental Data/Data', data=job_raw_data, compression="gzip")
+            self.create_raw_data_dataset(file, job_raw_data)
+
+    def create_raw_data_dataset(self,
+                                hdf5_group: h5py.Group,
+                                job_raw_data: np.ndarray):
+        """
+        This instance method creates the 'Experimental Data/Data' raw data dataset
+        within an HDF5 file or group, in the raw data format and compression of the
+        project (see store_raw_data).
+
+        Args:
+            hdf5_group (h5py.Group):
+                The HDF5 file or group in which the dataset is created.
+
+            job_raw_data (np.ndarray):
+                The raw data as a 2D int8 array following the HDF5 file conventions.
+        """
+
+        num_shots, num_clbits = job_raw_data.shape
+        if self.raw_data_format == 'packed':
+            packed_raw_data = np.packbits(job_raw_data, axis=1, bitorder='little')
+            chunks = None
+            if packed_raw_data.size > 0:
+                chunks = (min(num_shots, RAW_DATA_CHUNK_SHOTS), packed_raw_data.shape[1])
+            dataset = hdf5_group.create_dataset('Experimental Data/Data', data=packed_raw_data,
+                                                chunks=chunks, compression=self.raw_data_compression)
+            dataset.attrs['Format'] = 'packed'
+            dataset.attrs['Number of classical bits'] = num_clbits
+        else:
+            hdf5_group.create_dataset('Experimental Data/Data', data=job_raw_data,
+                                      compression=self.raw_data_compression)
+
+def fetch_available_job_results(job: QIJob,
+                                job_indices: list):
+    """
+    This function fetches from the Quantum Inspire platform the results of the
+    selected jobs contained within the project, and assigns them to
+    job.circuits_run_data[job_idx].results for every job which has already finished,
+    while the results of all other jobs remain None.
+
+    Since the results are fetched with the qi-compute-api-client package, on which
+    the QIJob class itself relies, an ImportError is raised if it is not available.
+
+    Args:
+        job (QIJob):
+            The user already-submitted job (project) object.
+
+        job_indices (list):
+            The indices of the jobs whose results are fetched.
+    """
+
+    if ApiClient is None:
+        raise ImportError("Fetching the results of individual jobs requires the qi-compute-api-client package.")
+
+    async def fetch_results():
+        async with ApiClient(config()) as client:
+            page_reader = PageReader[PageResult, RawJobResult]()
+            results_api = ResultsApi(client)
+            result_tasks = [
+                page_reader.get_all(results_api.read_results_by_job_id_results_job_job_id_get,
+                                    job_id=job.circuits_run_data[job_idx].job_id)
+                for job_idx in job_indices
+            ]
+            result_items = await asyncio.gather(*result_tasks)
+            for job_idx, result_item in zip(job_indices, result_items):
+                if result_item:
+                    job.circuits_run_data[job_idx].results = result_item[0]
+
+    run_async(fetch_results())
+
+class IncrementalProjectRecorder(StoreProjectRecord):
+    """
+    This class is responsible for storing a job (project) record incrementally,
+    i.e. each job contained within the project is stored as soon as its result
+    becomes available, instead of only after job.result() has returned for the whole
+    project, so that storing overlaps with the queue time of the remaining jobs.
+
+    The indices of the stored jobs are kept in a project manifest JSON file within
+    the project directory, which is updated after every job. An interrupted recording,
+    e.g. after a kernel crash, can therefore be resumed by instantiating the class
+    again for the same project, e.g. after job = QIJob.deserialize(provider, file_path),
+    in which case the already stored jobs are not rewritten.
+
+    The stored project record is identical to the one of the StoreProjectRecord class,
+    with the exception that the project timestamp is defined by the first job whose
+    result became available, if that is not the first job of the project.
+
+    The results of individual jobs are fetched with the qi-compute-api-client package
+    (see fetch_available_job_results). Should this fail, e.g. due to an incompatible
+    version, a warning is raised and the recorder falls back to storing all jobs once
+    job.result() is available for the whole project.
+    """
+
+    def __init__(self,
+                 job: QIJob,
+                 directory: str = None,
+                 silent: bool = False,
+                 store_circuit_figures: bool | str = True,
+                 raw_data_format: str = 'int8',
+                 raw_data_compression: str = 'gzip',
+                 wait: bool = True,
+                 poll_interval_in_seconds: float = 5,
+                 timeout_in_seconds: float = None):
+        """
+        Args:
+            job (QIJob):
+                The user already-submitted job (project) object. A job of the
+                NoisySimulator class is stored as soon as all its results are available.
+
+            directory (str):
+                Specifies the directory path in which the project record is to be
+                stored.
+                For no specified path, it defaults to "Documents/QuantumInspireProjects".
+
+            silent (bool):
+                A flag for not printing the progress of the recording.
+
+            store_circuit_figures (bool | str):
+                A user-configurable flag for storing locally the circuit PNG file
+                (see StoreProjectRecord). If set to 'deferred', each circuit figure is
+                rendered in a background process once its job has been stored.
+
+            raw_data_format (str):
+                The format of the raw data HDF5 dataset (see StoreProjectRecord).
+
+            raw_data_compression (str):
+                The compression filter of the raw data HDF5 dataset (see StoreProjectRecord).
+
+            wait (bool):
+                If True, the instantiation returns only once all jobs have been stored
+                (or have failed). If False, only the jobs whose results are already
+                available are stored, while the rest can be stored by calling
+                store_available_jobs again later on.
+
+            poll_interval_in_seconds (float):
+                The time interval with which the job results are polled.
+
+            timeout_in_seconds (float):
+                The maximum time to wait for all jobs to be stored, after which a
+                TimeoutError is raised. Defaults to None, i.e. no timeout.
+        """
+
+        if raw_data_format not in RAW_DATA_FORMATS:
+            raise ValueError(f"Unknown raw data format '{raw_data_format}'. Choose one of {RAW_DATA_FORMATS}.")
+        if raw_data_compression not in RAW_DATA_COMPRESSIONS:
+            raise ValueError(f"Unknown raw data compression '{raw_data_compression}'. "
+                             f"Choose one of {RAW_DATA_COMPRESSIONS}.")
+        self.raw_data_format = raw_data_format
+        self.raw_data_compression = raw_data_compression
+        self.storage = 'directory'
+        self.job = job
+        self.directory = directory
+        self.silent = silent
+        self.store_circuit_figures = store_circuit_figures
+        self.figure_futures = []
+        self.fetch_individual_results = True
+
+        if isinstance(job, QIJob):
+            self.job_key = f"batch_job_id_{job.batch_job_id}"
+        else:
+            self.job_key = f"job_id_{job.job_id()}"
+        self.project_dir = None
+        self.completed_job_indices = []
+        self.failed_job_indices = []
+        self.resume_project_directory()
+
+        self.store_available_jobs()
+        start_time = time.time()
+        while wait == True and not self.finished:
+            if timeout_in_seconds is not None and time.time() - start_time > timeout_in_seconds:
+                raise TimeoutError(f"Recording timed out with {len(self.completed_job_indices)} out of "
+                                   f"{self.num_jobs} jobs stored.")
+            time.sleep(poll_interval_in_seconds)
+            self.store_available_jobs()
+
+    @property
+    def num_jobs(self):
+        if hasattr(self.job, 'circuits_run_data'):
+            return len(self.job.circuits_run_data)
+        return len(self.job.circuits()) # the simulator jobs obtain circuits_run_data only with job.result()
+
+    @property
+    def finished(self):
+        return len(self.completed_job_indices) + len(self.failed_job_indices) == self.num_jobs
+
+    def resume_project_directory(self):
+        """
+        This instance method looks up the project manifest of an interrupted recording
+        of the same project within the base directory, and if found, restores the
+        project directory and the indices of the already stored jobs.
+        """
+
+        if self.directory is not None:
+            self.base_dir = Path(self.directory)
+        else:
+            self.base_dir = Path.home() / "Documents" / "QuantumInspireProjects"
+
+        for manifest_path in self.base_dir.glob("*/*/project_manifest_*.json"):
+            with open(manifest_path, 'r') as file:
+                manifest = json.load(file)
+            if manifest['Job key'] == self.job_key and manifest['Project name'] == self.job.program_name:
+                self.project_dir = manifest_path.parent
+                self.project_name = manifest['Project name']
+                self.date_timestamp, self.job_0_timestamp = manifest['Project timestamp'].split("_")
+                self.completed_job_indices = manifest['Completed job indices']
+                self.failed_job_indices = manifest['Failed job indices']
+                self.manifest_path = manifest_path
+                return
+
+    def store_manifest(self):
+        """
+        This instance method stores the project manifest, i.e. the indices of the
+        stored and of the failed jobs, atomically within the project directory.
+        """
+
+        manifest = {}
+        manifest['Job key'] = self.job_key
+        manifest['Project name'] = self.project_name
+        manifest['Project timestamp'] = f"{self.date_timestamp}_{self.job_0_timestamp}"
+        manifest['Number of jobs'] = self.num_jobs
+        manifest['Completed job indices'] = sorted(self.completed_job_indices)
+        manifest['Failed job indices'] = sorted(self.failed_job_indices)
+
+        temporary_path = self.manifest_path.with_suffix(".tmp")
+        with open(temporary_path, 'w') as file:
+            json.dump(manifest, file, indent=3)
+        os.replace(temporary_path, self.manifest_path)
+
+    def store_available_jobs(self):
+        """
+        This instance method stores all jobs whose results have become available
+        since the last call, and returns the list of their indices.
+        """
+
+        pending_job_indices = [job_idx for job_idx in range(self.num_jobs)
+                               if job_idx not in self.completed_job_indices
+                               and job_idx not in self.failed_job_indices]
+        if len(pending_job_indices) == 0:
+            return []
+
+        # status checked before fetching, so that jobs without results after the batch job
+        # has finished can be identified as failed
+        batch_job_done = self.job.done()
+        fetched_individual_results = False
+        if isinstance(self.job, QIJob) and self.fetch_individual_results == True:
+            try:
+                fetch_available_job_results(self.job, [job_idx for job_idx in pending_job_indices
+                                                       if self.job.circuits_run_data[job_idx].results is None])
+                fetched_individual_results = True
+            except (ImportError, AttributeError, TypeError) as exception_message:
+                self.fetch_individual_results = False
+                warnings.warn(f"\nFetching the results of individual jobs failed, hence the jobs are stored "
+                              f"only after the whole project has finished.\nError message: {exception_message}\n",
+                              UserWarning)
+        if fetched_individual_results == False:
+            if not batch_job_done:
+                return []
+            self.job.result()
+
+        available_job_indices = [job_idx for job_idx in pending_job_indices
+                                 if self.job.circuits_run_data[job_idx].results is not None]
+        if self.project_dir is None and len(available_job_indices) > 0:
+            job_idx = 0 if 0 in available_job_indices else available_job_indices[0]
+            self.create_project_directory(self.job, self.directory, job_idx)
+            self.obtain_backend_metadata(self.job)
+            self.store_project_json()
+            self.manifest_path = (
+                Path(self.project_dir)
+                / f"project_manifest_{self.date_timestamp}_{self.job_0_timestamp}.json"
+            )
+        elif len(available_job_indices) > 0 and not hasattr(self, 'backend_name'):
+            self.obtain_backend_metadata(self.job)
+
+        for job_idx in available_job_indices:
+            self.stored_job_records = []
+            self.store_job(self.job, job_idx, self.directory,
+                           self.store_circuit_figures if self.store_circuit_figures != 'deferred' else False)
+            ProjectRecordIndex(self.directory).add(self.stored_job_records)
+            if self.store_circuit_figures == 'deferred':
+                self.figure_futures += submit_circuit_figures([self.job_dir])
+            self.completed_job_indices.append(job_idx)
+            self.store_manifest()
+            if self.silent == False:
+                print(f"Stored job {job_idx} ({len(self.completed_job_indices)}/{self.num_jobs}) "
+                      f"in the following directory:\n{str(self.job_dir)}\n")
+
+        if batch_job_done:
+            failed_job_indices = [job_idx for job_idx in pending_job_indices
+                                  if job_idx not in available_job_indices]
+            if len(failed_job_indices) > 0:
+                self.failed_job_indices += failed_job_indices
+                if self.project_dir is not None:
+                    self.store_manifest()
+                warnings.warn(f"\nNo results available for the finished jobs with indices {failed_job_indices}.\n",
+                              UserWarning)
+
+        return available_job_indices
+
+class ROAssignmentMatrixCache:
+    """
+    This class is responsible for caching measured readout assignment matrices
+    on disk, so that a matrix that was recently measured for the same backend,
+    (ordered) qubit list and number of shots can be reused instead of submitting
+    a new calibration job.
+
+    The cache is stored in a single SQLite file within the same base directory as
+    the project records, i.e. "Documents/QuantumInspireProjects" by default.
+    Entries older than max_age_in_seconds are considered expired, while the least
+    recently used entries are evicted whenever more than max_entries are stored.
+    The space of removed entries is reclaimed, so that the size of the cache file
+    remains bounded, while lookups only read the file, so that multiple processes
+    can share the cache.
+    """
+
+    def __init__(self,
+                 directory: str = None,
+                 max_age_in_seconds: float = 3600,
+                 max_entries: int = 128):
+        """
+        Args:
+            directory (str):
+                Specifies the directory path in which the cache file is stored.
+                For no specified path, it defaults to "Documents/QuantumInspireProjects".
+
+            max_age_in_seconds (float):
+                The maximum age of a cached readout assignment matrix, after which
+                it is no longer returned and is removed from the cache.
+
+            max_entries (int):
+                The maximum number of cached readout assignment matrices. When exceeded,
+                the least recently used entries are removed from the cache.
+        """
+
+        if directory is not None:
+            self.base_dir = Path(directory)
+        else:
+            self.base_dir = Path.home() / "Documents" / "QuantumInspireProjects"
+        self.cache_file_path = self.base_dir / "ro_assignment_matrix_cache.sqlite"
+        self.max_age_in_seconds = max_age_in_seconds
+        self.max_entries = max_entries
+
+    def connect(self):
+        """
+        This instance method opens a connection to the cache file, creating
+        the cache table if it does not already exist.
+        """
+
+        self.base_dir.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(self.cache_file_path, timeout=30)
+        # shrinks the cache file whenever entries are removed (only effective for new files)
+        connection.execute("PRAGMA auto_vacuum = FULL")
+        with connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS matrices ("
+                "key TEXT PRIMARY KEY, backend_name TEXT, qubit_list TEXT, shots INTEGER, mode TEXT, "
+                "shape TEXT, matrix BLOB, created_on REAL, last_used REAL)"
+            )
+        return connection
+
+    @staticmethod
+    def cache_key(backend_name: str,
+                  qubit_list: list,
+                  num_shots: int,
+                  mode: str = 'full'):
+        """
+        This static method returns the key under which a readout assignment matrix
+        is cached.
+
+        Args:
+            backend_name (str):
+                The name of the backend on which the matrix was measured.
+
+            qubit_list (list):
+                An ordered list containing the integer indices of the measured qubits.
+
+            num_shots (int):
+                The number of shots used to measure the matrix.
+
+            mode (str):
+                The readout calibration mode (see apply_readout_circuit).
+        """
+
+        return f"{backend_name}__{list(qubit_list)}__{num_shots}__{mode}"
+
+    def get(self,
+            backend_name: str,
+            qubit_list: list,
+            num_shots: int,
+            mode: str = 'full'):
+        """
+        This instance method returns the cached readout assignment matrix,
+        or None if there is no (unexpired) matrix cached for the given arguments.
+
+        Args:
+            backend_name (str):
+                The name of the backend on which the matrix was measured.
+
+            qubit_list (list):
+                An ordered list containing the integer indices of the measured qubits.
+
+            num_shots (int):
+                The number of shots used to measure the matrix.
+
+            mode (str):
+                The readout calibration mode (see apply_readout_circuit).
+        """
+
+        if not self.cache_file_path.exists():
+            return None
+
+        key = self.cache_key(backend_name, qubit_list, num_shots, mode)
+        with closing(self.connect()) as connection:
+            row = connection.execute("SELECT shape, matrix, created_on FROM matrices WHERE key = ?",
+                                     (key,)).fetchone()
+            if row is None:
+                return None
+            shape, matrix, created_on = row
+            current_time = time.time()
+            # the lookup above only reads, while the cache is updated in a separate short write
+            with connection:
+                if current_time - created_on > self.max_age_in_seconds:
+                    connection.execute("DELETE FROM matrices WHERE key = ?", (key,))
+                    return None
+                connection.execute("UPDATE matrices SET last_used = ? WHERE key = ?", (current_time, key))
+        return np.frombuffer(matrix, dtype=np.float64).reshape(json.loads(shape)).copy()
+
+    def get_matrices(self,
+                     backend_name: str,
+                     qubit_groups: list[list],
+                     num_shots: int,
+                     mode: str = 'full'):
+        """
+        This instance method returns the cached readout assignment matrices of
+        multiple qubit groups, in the same format as extract_ro_assignment_matrices,
+        i.e. a dictionary with keys f"{qubit_list}". It returns None if the matrix of
+        any of the groups is not cached.
+
+        Args:
+            backend_name (str):
+                The name of the backend on which the matrices were measured.
+
+            qubit_groups (list(list)):
+                An ordered list of lists containing the different integer groupings
+                of qubits, e.g. qubit_groups = [[0, 2], [1, 3]].
+
+            num_shots (int):
+                The number of shots used to measure the matrices.
+
+            mode (str):
+                The readout calibration mode (see apply_readout_circuit).
+        """
+
+        assignment_probability_matrices = {}
+        for qubit_list in qubit_groups:
+            matrix = self.get(backend_name, qubit_list, num_shots, mode)
+            if matrix is None:
+                return None
+            assignment_probability_matrices[f"{qubit_list}"] = matrix
+        return assignment_probability_matrices
+
+    def put(self,
+            backend_name: str,
+            qubit_list: list,
+            num_shots: int,
+            ro_assignment_matrix: np.ndarray,
+            mode: str = 'full'):
+        """
+        This instance method stores a readout assignment matrix in the cache,
+        and removes expired and least recently used entries.
+
+        Args:
+            backend_name (str):
+                The name of the backend on which the matrix was measured.
+
+            qubit_list (list):
+                An ordered list containing the integer indices of the measured qubits.
+
+            num_shots (int):
+                The number of shots used to measure the matrix.
+
+            ro_assignment_matrix (np.ndarray):
+                The readout assignment matrix.
+
+            mode (str):
+                The readout calibration mode (see apply_readout_circuit).
+        """
+
+        key = self.cache_key(backend_name, qubit_list, num_shots, mode)
+        ro_assignment_matrix = np.ascontiguousarray(ro_assignment_matrix, dtype=np.float64)
+        current_time = time.time()
+        with closing(self.connect()) as connection, connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO matrices "
+                "(key, backend_name, qubit_list, shots, mode, shape, matrix, created_on, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, backend_name, json.dumps(list(qubit_list)), num_shots, mode,
+                 json.dumps(list(ro_assignment_matrix.shape)), ro_assignment_matrix.tobytes(),
+                 current_time, current_time)
+            )
+            connection.execute("DELETE FROM matrices WHERE created_on < ?",
+                               (current_time - self.max_age_in_seconds,))
+            connection.execute("DELETE FROM matrices WHERE key NOT IN "
+                               "(SELECT key FROM matrices ORDER BY last_used DESC LIMIT ?)",
+                               (self.max_entries,))
+
+    def clear(self):
+        """
+        This instance method removes all entries from the cache.
+        """
+
+        if self.cache_file_path.exists():
+            self.cache_file_path.unlink()
+
+class ProjectRecordIndex:
+    """
+    This class is responsible for maintaining a persistent index of the stored
+    job records, which maps each Job ID to its job directory, together with the
+    project name, backend name and job timestamp, so that a job record can be
+    found without scanning the whole projects directory.
+
+    The index is stored in a single SQLite file within the same base directory as
+    the project records, i.e. "Documents/QuantumInspireProjects" by default.
+    For jobs stored in a project HDF5 container, the job directory is the path of
+    the job group within the container, i.e. <container path>/<job group name>.
+    It is updated by the StoreProjectRecord class and, for Job IDs which are not
+    found, from the recently modified project directories (see update), while it
+    can be rebuilt at any time from a full scan of the base directory (see rebuild).
+    """
+
+    def __init__(self,
+                 directory: str = None):
+        """
+        Args:
+            directory (str):
+                Specifies the directory path in which the project records and the
+                index file are stored.
+                For no specified path, it defaults to "Documents/QuantumInspireProjects".
+        """
+
+        if directory is not None:
+            self.base_dir = Path(directory)
+        else:
+            self.base_dir = Path.home() / "Documents" / "QuantumInspireProjects"
+        self.index_file_path = self.base_dir / "project_record_index.sqlite"
+
+    def connect(self):
+        """
+        This instance method opens a connection to the index file, creating
+        the index table if it does not already exist.
+        """
+
+        self.base_dir.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(self.index_file_path, timeout=30)
+        with connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "job_dir TEXT PRIMARY KEY, job_id TEXT, job_idx INTEGER, "
+                "project_name TEXT, backend_name TEXT, job_timestamp TEXT)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS jobs_job_id ON jobs (job_id)")
+            connection.execute("CREATE TABLE IF NOT EXISTS scans (scan TEXT PRIMARY KEY, scan_time REAL)")
+        return connection
+
+    def add(self,
+            job_records: list):
+        """
+        This instance method adds (or updates) job records to the index.
+
+        Args:
+            job_records (list):
+                A list of dictionaries, each containing the keys 'Job directory',
+                'Job ID', 'Job index', 'Project name', 'Backend name' and 'Job timestamp'.
+        """
+
+        with closing(self.connect()) as connection, connection:
+            self.insert(connection, job_records)
+
+    def insert(self,
+               connection: sqlite3.Connection,
+               job_records: list):
+        """
+        This instance method inserts (or updates) job records within an already open
+        connection, i.e. as part of the transaction of the caller (see add).
+
+        Args:
+            connection (sqlite3.Connection):
+                The connection to the index file (see connect).
+
+            job_records (list):
+                A list of dictionaries, each containing the keys 'Job directory',
+                'Job ID', 'Job index', 'Project name', 'Backend name' and 'Job timestamp'.
+        """
+
+        rows = [(Path(job_record['Job directory']).resolve().relative_to(self.base_dir.resolve()).as_posix(),
+                 job_record['Job ID'], job_record['Job index'], job_record['Project name'],
+                 job_record['Backend name'], job_record['Job timestamp'])
+                for job_record in job_records]
+        connection.executemany("INSERT OR REPLACE INTO jobs VALUES (?, ?, ?, ?, ?, ?)", rows)
+
+    def lookup(self,
+               job_id: str):
+        """
+        This instance method returns the job directory of the given Job ID,
+        or None if the Job ID is not (or no longer) found in the index.
+
+        Since the jobs of a single simulator job share the same Job ID, the
+        job directory with the highest job index is returned in that case.
+
+        Args:
+            job_id (str):
+                The Job ID, as this appears also in the Quantum Inspire platform.
+        """
+
+        if not self.index_file_path.exists():
+            return None
+        with closing(self.connect()) as connection:
+            rows = connection.execute(
+                "SELECT job_dir FROM jobs WHERE job_id = ? ORDER BY job_idx DESC", (job_id,)
+            ).fetchall()
+        # entries of moved job directories remain in the index until it is rebuilt
+        for row in rows:
+            job_dir = self.base_dir / row[0]
+            if job_dir.is_dir() or job_dir.parent.is_file():
+                return job_dir
+        return None
+
+    def scan_project_directory(self,
+                               project_json_path: Path):
+        """
+        This instance method returns the job records of a single project directory,
+        using its project metadata JSON file and the job_idx_<job_idx>__job_id_<job_id>
+        name of each job directory, or of each job group within a project HDF5 container.
+
+        Args:
+            project_json_path (Path):
+                The path of the project metadata JSON file of the project directory.
+        """
+
+        with open(project_json_path, 'r') as file:
+            project_data = json.load(file)
+
+        job_records = []
+        for job_dir in project_json_path.parent.iterdir():
+            if not (job_dir.is_dir() and job_dir.name.startswith("job_idx_") and "__job_id_" in job_dir.name):
+                continue
+            job_idx, job_id = job_dir.name[len("job_idx_"):].split("__job_id_", 1)
+            job_result_path = next(job_dir.glob("job_result_*.json"), None)
+            job_records.append({
+                'Job directory': job_dir,
+                'Job ID': job_id,
+                'Job index': int(job_idx),
+                'Project name': project_data['Project name'],
+                'Backend name': project_data['Backend name'],
+                'Job timestamp': (job_result_path.stem[len("job_result_"):]
+                                  if job_result_path is not None else None)
+            })
+        for container_path in project_json_path.parent.glob("project_record_*.hdf5"):
+            with h5py.File(container_path, 'r') as file:
+                for job_group_name, job_group in file['Jobs'].items():
+                    job_records.append({
+                        'Job directory': container_path / job_group_name,
+                        'Job ID': job_group.attrs['Job ID'],
+                        'Job index': int(job_group_name[len("job_idx_"):].split("__job_id_")[0]),
+                        'Project name': project_data['Project name'],
+                        'Backend name': project_data['Backend name'],
+                        'Job timestamp': job_group.attrs['Job timestamp']
+                    })
+        return job_records
+
+    def rebuild(self):
+        """
+        This instance method rebuilds the whole index from a full scan of the base
+        directory (see scan_project_directory), e.g. after project records have
+        been moved within the base directory. The old entries are replaced within
+        a single transaction, so that concurrent readers never see an empty index.
+        """
+
+        scan_time = time.time()
+        job_records = []
+        for project_json_path in self.base_dir.rglob("project_metadata_*.json"):
+            job_records += self.scan_project_directory(project_json_path)
+
+        with closing(self.connect()) as connection, connection:
+            connection.execute("DELETE FROM jobs")
+            self.insert(connection, job_records)
+            connection.execute("INSERT OR REPLACE INTO scans VALUES ('Last scan', ?)", (scan_time,))
+
+    def update(self):
+        """
+        This instance method updates the index with the project directories which
+        were created, modified or moved since the last scan of the base directory, i.e.
+        Documents/QuantumInspireProjects/<date>/<time>_<project name>, as created by
+        the StoreProjectRecord class, so that the job directories of all other projects
+        are not scanned. Records stored in other layouts are only found by rebuild.
+        """
+
+        scan_time = time.time()
+        with closing(self.connect()) as connection:
+            row = connection.execute("SELECT scan_time FROM scans WHERE scan = 'Last scan'").fetchone()
+        # margin for coarse filesystem timestamps
+        last_scan_time = row[0] - 2 if row is not None else float('-inf')
+
+        def modified_since_last_scan(path: Path):
+            path_stat = path.stat()
+            # st_ctime also changes when a directory is moved
+            return max(path_stat.st_mtime, path_stat.st_ctime) >= last_scan_time
+
+        job_records = []
+        if self.base_dir.is_dir():
+            for date_dir in self.base_dir.iterdir():
+                if not date_dir.is_dir():
+                    continue
+                # all project directories of a modified date directory are scanned, since
+                # moving a project (or date) directory does not modify its subdirectories
+                date_dir_modified = modified_since_last_scan(date_dir)
+                for project_dir in date_dir.iterdir():
+                    if not (project_dir.is_dir() and (date_dir_modified or modified_since_last_scan(project_dir))):
+                        continue
+                    for project_json_path in project_dir.glob("project_metadata_*.json"):
+                        job_records += self.scan_project_directory(project_json_path)
+
+        with closing(self.connect()) as connection, connection:
+            self.insert(connection, job_records)
+            connection.execute("INSERT OR REPLACE INTO scans VALUES ('Last scan', ?)", (scan_time,))
 
 class RetrieveProjectRecord:
     """
@@ -391,6 +1573,14 @@ class RetrieveProjectRecord:
 
     loaded_result.get_counts()
     loaded_result.get_memory()
+
+    Instantiating the class only locates the job directory. The circuit, the job
+    result and the raw data are read lazily when first accessed and memoized,
+    while get_memory_array reads only the requested slice of the raw data.
+
+    Job records stored in a project HDF5 container (see StoreProjectRecord) are
+    retrieved transparently, in which case job_dir is the path of the job group
+    within the container, i.e. <container path>/<job group name>.
     """
 
     def __init__(self,
@@ -408,49 +1598,151 @@ class RetrieveProjectRecord:
         """
         
         self.job_id = job_id
-        if directory is not None:
-            project_dir = Path(directory)
-        else:
-            project_dir = Path.home() / "Documents" / "QuantumInspireProjects"
-        
-        self.job_dir = None
-        for job_dir_path in project_dir.rglob("*"):
-            if job_dir_path.is_dir() and job_id in job_dir_path.name:
-                self.job_dir = job_dir_path
+        # the job directory is looked up in the project record index, which is only
+        # updated from the recently modified project directories for unindexed Job IDs
+        project_record_index = ProjectRecordIndex(directory)
+        self.job_dir = project_record_index.lookup(job_id)
+        if self.job_dir is None:
+            project_record_index.update()
+            self.job_dir = project_record_index.lookup(job_id)
         if self.job_dir == None:
-            raise ValueError(f'No files found for Job ID: {job_id}')
+            raise ValueError(f'No files found for Job ID: {job_id}. If the project records have been '
+                             f'moved or copied, run ProjectRecordIndex(directory).rebuild() first.')
+
+    @classmethod
+    def from_job_dir(cls,
+                     job_dir: str):
+        """
+        This class method instantiates the class directly from a job directory,
+        as created by the StoreProjectRecord class, without looking up the Job ID.
+
+        Args:
+            job_dir (str):
+                The job directory, named job_idx_<job_idx>__job_id_<job_id>.
+        """
+
+        record = cls.__new__(cls)
+        record.job_dir = Path(job_dir)
+        record.job_id = record.job_dir.name.split("__job_id_", 1)[-1]
+        return record
+
+    @cached_property
+    def qc(self):
+        """
+        The QuantumCircuit object of the job, parsed on first access.
+        """
+
+        return self.retrieve_qc()
+
+    @cached_property
+    def container_path(self):
+        """
+        The path of the project HDF5 container, or None for jobs stored in a job directory.
+        """
+
+        if self.job_dir.parent.is_file():
+            return self.job_dir.parent
+        return None
+
+    @cached_property
+    def job_result(self):
+        """
+        The contents of the job result JSON file, read on first access.
+        """
+
+        if self.container_path is not None:
+            with h5py.File(self.container_path, "r") as f:
+                job_group = f["Jobs"][self.job_dir.name]
+                job_result = {key: None if isinstance(value, h5py.Empty) else
+                              value.item() if isinstance(value, np.generic) else value
+                              for key, value in job_group.attrs.items()}
+                job_result['Counts'] = dict(zip(job_group["Counts"]["Bitstrings"].asstr()[()],
+                                                job_group["Counts"]["Values"][()].tolist()))
+            return job_result
+
+        json_file_path = next(
+            file_path
+            for file_path in self.job_dir.iterdir()
+            if "job_result" in file_path.name
+        )
+
+        with open(json_file_path, 'r') as file:
+            return json.load(file)
+
+    @cached_property
+    def raw_data_file_path(self):
+        """
+        The path of the raw data HDF5 file, or None for jobs stored without raw data
+        or stored in a project HDF5 container.
+        """
+
+        if self.container_path is not None:
+            return None
+        return next(
+            (file_path
+             for file_path in self.job_dir.iterdir()
+             if "raw_data" in file_path.name),
+            None
+        )
+
+    @cached_property
+    def memory(self):
+        """
+        The job raw data in a list of string bitstrings format, read on first access
+        (see get_memory).
+        """
+
+        try:
+            with self.open_raw_data() as hdf5_dataset:
+                hdf5_data = read_raw_data(hdf5_dataset)
+            return ShotMatrix(hdf5_data).to_memory()
 
-        self.retrieve_qc()
-        self.get_counts()
-        self.get_memory()
+        except:
+            return []
+
+    @contextmanager
+    def open_raw_data(self):
+        """
+        This context manager instance method opens the raw data HDF5 dataset of the
+        job, either from the raw data HDF5 file or from the project HDF5 container,
+        and yields it, or yields None for jobs stored without raw data.
+        """
+
+        if self.container_path is not None:
+            with h5py.File(self.container_path, "r") as f:
+                job_group = f["Jobs"][self.job_dir.name]
+                yield job_group["Experimental Data"]["Data"] if "Experimental Data" in job_group else None
+        elif self.raw_data_file_path is None:
+            yield None
+        else:
+            with h5py.File(self.raw_data_file_path, "r") as f:
+                yield f["Experimental Data"]["Data"]
 
     def retrieve_qc(self):
         """
         This instance method retrieves the QuantumCircuit object of the job.
         """
 
+        if self.container_path is not None:
+            with h5py.File(self.container_path, "r") as f:
+                qasm3_program = f["Jobs"][self.job_dir.name]["OpenQASM3 program"].asstr()[()]
+            self.qc = qasm3.loads(qasm3_program)
+            return self.qc
+
         qasm3_file_path = next(
             file_path
             for file_path in self.job_dir.iterdir()
             if "qasm3_program" in file_path.name
         )
         self.qc = qasm3.load(qasm3_file_path)
+        return self.qc
 
     def get_counts(self):
         """
         This instance method retrieves the job counts in a dictionary format.
         """
 
-        json_file_path = next(
-            file_path
-            for file_path in self.job_dir.iterdir()
-            if "job_result" in file_path.name
-        )
-
-        with open(json_file_path, 'r') as file:
-            json_data = json.load(file)
-
-        counts = json_data['Counts']
+        counts = dict(self.job_result['Counts'])
         return counts
 
     def get_memory(self,
@@ -478,20 +1770,206 @@ class RetrieveProjectRecord:
                 respect to other functions used in other modules.
         """
 
-        try:
-            hdf5_file_dir = next(
-                file_path
-                for file_path in self.job_dir.iterdir()
-                if "raw_data" in file_path.name
-            )
-            
-            with h5py.File(hdf5_file_dir, "r") as f:
-                hdf5_data = f["Experimental Data"]["Data"][()]
-            raw_shots = []
-            for shot_idx in range(len(hdf5_data)):
-                shot_string = ''.join(map(str, hdf5_data[shot_idx][::-1]))
-                raw_shots.append(shot_string)
-            return raw_shots
+        return self.memory
 
-        except:
-            return []
\ No newline at end of file
+    def get_memory_array(self,
+                         start: int = None,
+                         stop: int = None,
+                         blocks: int | list = None,
+                         num_qubits: int = None):
+        """
+        This instance method reads only the shots [start, stop) and, optionally,
+        only the requested measurement blocks of the job raw data from the HDF5 file,
+        and returns them as a 2D int8 array following the HDF5 file conventions
+        (see StoreProjectRecord.store_raw_data), i.e. ShotMatrix(memory_array)
+        can be directly used for counting.
+
+        For jobs were the variable 'memory' was set to False, an empty array is returned.
+
+        Args:
+            start (int):
+                The first shot to be read. Defaults to None, i.e. the first shot.
+
+            stop (int):
+                The shot up to which (not including) the raw data is read.
+                Defaults to None, i.e. up to the last shot.
+
+            blocks (int | list):
+                The index (or list of indices) of the measurement blocks to be read,
+                where block b contains the measurement outcomes stored in the
+                classical bits [b*num_qubits, (b+1)*num_qubits), following the
+                conventions of get_multi_counts.
+                Defaults to None, i.e. all classical bits.
+
+            num_qubits (int):
+                The number of qubits measured in each measurement block.
+                Required when specifying blocks.
+        """
+
+        columns = None
+        if blocks is not None:
+            if num_qubits is None:
+                raise ValueError("num_qubits must be specified when selecting measurement blocks.")
+            columns = [block_idx*num_qubits + bit_idx
+                       for block_idx in np.atleast_1d(blocks)
+                       for bit_idx in range(num_qubits)]
+
+        with self.open_raw_data() as hdf5_dataset:
+            if hdf5_dataset is None:
+                return np.zeros((0, 0), dtype=np.int8)
+            return read_raw_data(hdf5_dataset, start, stop, columns)
+
+    def iter_memory_chunks(self,
+                           chunk_size: int = 2**14):
+        """
+        This generator instance method reads the job raw data from the HDF5 file
+        in chunks of chunk_size shots, so that the whole raw data never needs to be
+        held in memory. Each chunk is yielded as a 2D array of N rows, representing
+        each shot, and M columns, following the HDF5 file conventions (see
+        StoreProjectRecord.store_raw_data).
+
+        For jobs were the variable 'memory' was set to False, nothing is yielded.
+
+        Args:
+            chunk_size (int):
+                The (maximum) number of shots contained in each chunk.
+        """
+
+        with self.open_raw_data() as hdf5_dataset:
+            if hdf5_dataset is None:
+                return
+            for start in range(0, hdf5_dataset.shape[0], chunk_size):
+                yield read_raw_data(hdf5_dataset, start, start+chunk_size)
+
+def load_project_records(source: str | list,
+                         directory: str = None,
+                         raw_data: bool = False,
+                         max_workers: int = 8):
+    """
+    This function loads the records of many jobs at once, e.g. of all jobs of a
+    parameter sweep project, into a columnar structure, i.e. a pandas DataFrame
+    containing one row of metadata per job, together with NumPy arrays stacking
+    the counts and (optionally) the raw data of all jobs.
+
+    The records are read in parallel from a pool of threads, while the circuits
+    are not parsed at all (see RetrieveProjectRecord for loading a single job).
+
+    Args:
+        source (str | list):
+            Either a project directory, as created by the StoreProjectRecord class
+            (with either storage option), in which case all of its jobs are loaded
+            in the order of their job index,
+            or a list of Job IDs, in which case the jobs are loaded in that order.
+
+        directory (str):
+            Specifies the directory path in which the project records are stored,
+            used for looking up Job IDs.
+            For no specified path, it defaults to "Documents/QuantumInspireProjects".
+
+        raw_data (bool):
+            If True, the raw data of all jobs is loaded as well.
+
+        max_workers (int):
+            The maximum number of threads reading the records in parallel.
+
+    Returns:
+        A tuple (records, arrays), where records is a pandas DataFrame containing
+        the project and job metadata of each job (one row per job), and arrays is
+        a dictionary containing:
+        * 'counts', an array of shape (num_jobs, 2**num_clbits), where entry [i, j]
+          is the number of counts of job i for the bitstring with integer value j.
+          Whenever the dense array would exceed MAX_DENSE_LOAD_COUNTS_ENTRIES entries,
+          e.g. for projects with many mid-circuit measurements, a scipy.sparse
+          csr_matrix of the same shape is returned instead, containing only the
+          observed bitstrings,
+        * 'memory' (if raw_data is True), an int8 array of shape
+          (num_jobs, num_shots, num_clbits), following the HDF5 file conventions
+          (see StoreProjectRecord.store_raw_data).
+        Whenever the jobs differ in the number of classical bits or shots, or the
+        bit register is larger than MAX_SPARSE_LOAD_COUNTS_BITS, a list containing
+        one entry per job is returned instead of a stacked array.
+    """
+
+    if isinstance(source, (str, Path)):
+        job_dirs = [job_dir for job_dir in Path(source).iterdir()
+                    if job_dir.is_dir() and job_dir.name.startswith("job_idx_")]
+        for container_path in Path(source).glob("project_record_*.hdf5"):
+            with h5py.File(container_path, "r") as f:
+                job_dirs += [container_path / job_group_name for job_group_name in f["Jobs"]]
+        job_dirs.sort(key=lambda job_dir: int(job_dir.name[len("job_idx_"):].split("__job_id_")[0]))
+    else:
+        project_record_index = ProjectRecordIndex(directory)
+        job_dirs = [project_record_index.lookup(job_id) for job_id in source]
+        if None in job_dirs:
+            project_record_index.update()
+            job_dirs = [project_record_index.lookup(job_id) for job_id in source]
+        missing_job_ids = [job_id for job_id, job_dir in zip(source, job_dirs) if job_dir is None]
+        if len(missing_job_ids) > 0:
+            raise ValueError(f'No files found for Job IDs: {missing_job_ids}')
+
+    project_data = {}
+    project_dirs = {job_dir: job_dir.parent.parent if job_dir.parent.is_file() else job_dir.parent
+                    for job_dir in job_dirs}
+    for project_dir in set(project_dirs.values()):
+        project_json_path = next(project_dir.glob("project_metadata_*.json"), None)
+        project_data[project_dir] = {}
+        if project_json_path is not None:
+            with open(project_json_path, 'r') as file:
+                project_data[project_dir] = json.load(file)
+
+    def load_record(job_dir):
+        record = RetrieveProjectRecord.from_job_dir(job_dir)
+        job_result = dict(record.job_result)
+        memory_array = record.get_memory_array() if raw_data == True else None
+        return record, job_result, memory_array
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        loaded_records = list(executor.map(load_record, job_dirs))
+
+    rows = []
+    counts_list = []
+    memory_list = []
+    for record, job_result, memory_array in loaded_records:
+        counts_list.append(job_result.pop('Counts'))
+        memory_list.append(memory_array)
+        row = {
+            'Project name': project_data[project_dirs[record.job_dir]].get('Project name'),
+            'Backend name': project_data[project_dirs[record.job_dir]].get('Backend name'),
+            'Job index': int(record.job_dir.name[len("job_idx_"):].split("__job_id_")[0]),
+        }
+        row.update(job_result)
+        row['Job directory'] = str(record.job_dir)
+        rows.append(row)
+    records = pd.DataFrame(rows)
+
+    arrays = {}
+    num_clbits = set(records['Number of classical bits specified']) if len(rows) > 0 else set()
+    if len(num_clbits) == 1 and next(iter(num_clbits)) <= MAX_SPARSE_LOAD_COUNTS_BITS:
+        num_clbits = next(iter(num_clbits))
+        job_indices = []
+        outcomes = []
+        values = []
+        for job_idx, counts in enumerate(counts_list):
+            for bitstring, count in counts.items():
+                if count != 0:
+                    job_indices.append(job_idx)
+                    outcomes.append(int(bitstring.replace(" ", ""), 2))
+                    values.append(count)
+        # duplicate entries (if any) are summed up by csr_matrix
+        counts_matrix = csr_matrix((np.array(values, dtype=np.int64),
+                                    (np.array(job_indices, dtype=np.int64), np.array(outcomes, dtype=np.int64))),
+                                   shape=(len(rows), 2**num_clbits))
+        if len(rows) * 2**num_clbits <= MAX_DENSE_LOAD_COUNTS_ENTRIES:
+            arrays['counts'] = counts_matrix.toarray()
+        else:
+            arrays['counts'] = counts_matrix
+    else:
+        arrays['counts'] = counts_list
+
+    if raw_data == True:
+        if len({memory_array.shape for memory_array in memory_list}) == 1:
+            arrays['memory'] = np.stack(memory_list)
+        else:
+            arrays['memory'] = memory_list
+
+    return records, arrays
@@ -10,9 +10,14 @@ Authors: Marios Samiotis
 """
 
 import numpy as np
+from itertools import islice
+from collections.abc import Mapping
 from qiskit import QuantumCircuit
 from qiskit.result.result import Result
-from qiskit.quantum_info import SparsePauliOp
+
+# Bit registers larger than this are never expanded into dense counts dictionaries
+# containing all 2**num_bits bitstrings, unless explicitly requested.
+MAX_DENSE_COUNTS_BITS = 20
 
 def obtain_binary_list(num_qubits: int):
     """
@@ -32,6 +37,127 @@ def obtain_binary_list(num_qubits: int):
         binary_list.append(np.binary_repr(binary_str_idx, num_qubits))
     return binary_list
 
+class SparseCounts(Mapping):
+    """
+    Sparse counts dictionary, storing only the observed measurement outcomes.
+
+    The outcomes are stored as a sorted array of integer keys, together with
+    an array of their respective counts (or probabilities), so that no structure
+    of size 2**num_bits is ever allocated. It behaves as a read-only dictionary
+    which iterates over the observed bitstrings in incremental binary order,
+    while looking up a bitstring which was never observed returns 0, just as
+    for the dense (pre-filled) counts dictionaries.
+    """
+
+    def __init__(self,
+                 outcomes: np.ndarray,
+                 counts: np.ndarray,
+                 num_bits: int):
+        """
+        Args:
+            outcomes (np.ndarray):
+                The observed outcomes, expressed as integers whose binary representation
+                follows the convention 'cK-1,cK-2,...,c2,c1,c0'. They need not be sorted
+                nor unique; counts of repeated outcomes are summed together.
+
+            counts (np.ndarray):
+                The counts (or probabilities) of each observed outcome.
+
+            num_bits (int):
+                The size of the bit register, i.e. the length of each bitstring.
+        """
+
+        outcome_dtype = np.int64 if num_bits < 63 else object
+        outcomes = np.asarray(outcomes, dtype=outcome_dtype)
+        counts = np.asarray(counts)
+        if outcomes.shape != counts.shape or outcomes.ndim != 1:
+            raise ValueError("Outcomes and counts must be 1D arrays of the same length.")
+
+        self.num_bits = num_bits
+        self.outcomes, inverse_indices = np.unique(outcomes, return_inverse=True)
+        self.counts = np.zeros(len(self.outcomes), dtype=counts.dtype)
+        np.add.at(self.counts, inverse_indices.ravel(), counts)
+
+    @classmethod
+    def from_dict(cls,
+                  counts_dict: dict,
+                  num_bits: int = None):
+        """
+        This class method creates a SparseCounts object from a counts dictionary,
+        e.g. as returned from result.get_counts(). Bitstrings with zero counts
+        are not stored.
+
+        Args:
+            counts_dict (dict):
+                A dictionary with bitstrings as keys and counts (or probabilities)
+                as values.
+
+            num_bits (int):
+                The size of the bit register. Defaults to None, in which case the
+                longest bitstring defines it.
+        """
+
+        bitstrings = [bitstring.replace(' ', '') for bitstring, count in counts_dict.items() if count != 0]
+        counts = [count for count in counts_dict.values() if count != 0]
+        if num_bits is None:
+            num_bits = max((len(bitstring) for bitstring in bitstrings), default=0)
+        return cls([int(bitstring, 2) for bitstring in bitstrings], counts, num_bits)
+
+    def _outcome_position(self,
+                          bitstring: str):
+        if not isinstance(bitstring, str):
+            raise KeyError(bitstring)
+        try:
+            outcome = int(bitstring.replace(' ', ''), 2)
+        except ValueError:
+            raise KeyError(bitstring) from None
+        position = int(np.searchsorted(self.outcomes, outcome))
+        if position < len(self.outcomes) and self.outcomes[position] == outcome:
+            return position
+        return None
+
+    def __getitem__(self,
+                    bitstring: str):
+        position = self._outcome_position(bitstring)
+        if position is None:
+            return self.counts.dtype.type(0).item()
+        return self.counts[position].item()
+
+    def __contains__(self,
+                     bitstring: str):
+        try:
+            return self._outcome_position(bitstring) is not None
+        except KeyError:
+            return False
+
+    def __iter__(self):
+        for outcome in self.outcomes:
+            yield format(int(outcome), f'0{self.num_bits}b')
+
+    def __len__(self):
+        return len(self.outcomes)
+
+    def __repr__(self):
+        return f"SparseCounts({self.to_dict()})"
+
+    def to_dict(self,
+                dense: bool = False):
+        """
+        This instance method converts the sparse counts into a regular dictionary.
+
+        Args:
+            dense (bool):
+                If True, all 2**num_bits bitstrings are included in the dictionary,
+                including those which were never observed. Only feasible for small
+                bit registers.
+        """
+
+        if dense == True:
+            dense_counts = np.zeros(2**self.num_bits, dtype=self.counts.dtype)
+            dense_counts[self.outcomes.astype(np.int64)] = self.counts
+            return dict(zip(obtain_binary_list(self.num_bits), dense_counts.tolist()))
+        return dict(zip(self, self.counts.tolist()))
+
 def get_raw_data(qc: QuantumCircuit,
                  result: Result,
                  circuit_nr: int = None):
@@ -62,8 +188,213 @@ def get_raw_data(qc: QuantumCircuit,
 
     return raw_data
 
-def get_multi_counts(raw_data_shots: list,
-                     num_qubits: int):
+class ShotMatrix:
+    """
+    Array-backed container for the raw data shots of a single quantum circuit.
+
+    The bitstrings returned by result.get_memory() are parsed only once into a
+    2D uint8 array of N rows, representing each shot, and K columns, representing
+    each classical bit. Following the HDF5 convention of the StoreProjectRecord
+    class, column 0 holds the outcome stored in bit c0, i.e. the rightmost bit of
+    the original bitstring, while column K-1 holds the outcome stored in bit cK-1.
+
+    All counting operations are then performed in a vectorized manner on the array,
+    instead of walking through every shot in Python.
+
+    For compatibility with functions expecting a list of bitstrings, a ShotMatrix
+    also behaves as a read-only sequence of bitstrings, i.e. len(shot_matrix) is the
+    number of shots, while shot_matrix[i] returns the bitstring of shot i.
+    """
+
+    def __init__(self,
+                 bits: np.ndarray):
+        """
+        Args:
+            bits (np.ndarray):
+                A 2D array of shape (num_shots, num_clbits) containing only zeros
+                and ones, where column j corresponds to the classical bit cj.
+        """
+
+        bits = np.asarray(bits, dtype=np.uint8)
+        if bits.ndim != 2:
+            raise ValueError(f"Expected a 2D array of shape (num_shots, num_clbits), got shape {bits.shape}.")
+        self.bits = bits
+
+    @classmethod
+    def from_memory(cls,
+                    raw_data_shots: list,
+                    num_clbits: int = None):
+        """
+        This class method parses a list of bitstrings, as returned from
+        result.get_memory(), into a ShotMatrix object.
+
+        Args:
+            raw_data_shots (list):
+                The raw data shots, where each entry of the list contains a bitstring
+                following the convention 'cK-1,cK-2,...,c2,c1,c0'.
+
+            num_clbits (int):
+                The size of the bit register. Bitstrings shorter than num_clbits
+                are padded with zeros on the left, similarly to get_raw_data.
+                Defaults to None, in which case the longest bitstring defines it.
+        """
+
+        num_shots = len(raw_data_shots)
+        if num_clbits is None:
+            num_clbits = max((len(shot) for shot in raw_data_shots), default=0)
+        if num_shots == 0 or num_clbits == 0:
+            return cls(np.zeros((num_shots, num_clbits), dtype=np.uint8))
+
+        joined_shots = ''.join(raw_data_shots)
+        if len(joined_shots) != num_shots * num_clbits:
+            joined_shots = ''.join(shot.zfill(num_clbits) for shot in raw_data_shots)
+            if len(joined_shots) != num_shots * num_clbits:
+                raise ValueError(f"Raw data shots exceed the bit register size of {num_clbits} bits.")
+
+        characters = np.frombuffer(joined_shots.encode('ascii'), dtype=np.uint8)
+        bits = characters.reshape(num_shots, num_clbits) - ord('0')
+        if np.any(bits > 1):
+            raise ValueError("Raw data shots must contain only the characters '0' and '1'.")
+        # reversed so that column j corresponds to the classical bit cj
+        return cls(np.ascontiguousarray(bits[:, ::-1]))
+
+    @property
+    def num_shots(self):
+        return self.bits.shape[0]
+
+    @property
+    def num_clbits(self):
+        return self.bits.shape[1]
+
+    def __len__(self):
+        return self.num_shots
+
+    def __getitem__(self,
+                    shot_idx: int | slice):
+        if isinstance(shot_idx, slice):
+            return ShotMatrix(self.bits[shot_idx])
+        characters = self.bits[shot_idx, ::-1] + np.uint8(ord('0'))
+        return characters.tobytes().decode('ascii')
+
+    def __iter__(self):
+        for shot_idx in range(self.num_shots):
+            yield self[shot_idx]
+
+    def get_columns(self,
+                    start: int,
+                    stop: int):
+        """
+        This instance method returns a ShotMatrix containing only the classical
+        bits cj with start <= j < stop. The returned object is a view sharing the
+        same underlying array, so that no shots are copied.
+
+        Args:
+            start (int):
+                The index of the first classical bit.
+
+            stop (int):
+                The index after the last classical bit.
+        """
+
+        return ShotMatrix(self.bits[:, start:stop])
+
+    def to_memory(self):
+        """
+        This instance method converts the shots back into a list of bitstrings,
+        in the same format as returned from result.get_memory().
+        """
+
+        num_clbits = self.num_clbits
+        if self.num_shots == 0 or num_clbits == 0:
+            return [''] * self.num_shots
+        characters = self.bits[:, ::-1] + np.uint8(ord('0'))
+        joined_shots = characters.tobytes().decode('ascii')
+        return [joined_shots[shot_idx*num_clbits:(shot_idx+1)*num_clbits]
+                for shot_idx in range(self.num_shots)]
+
+    def get_block_indices(self,
+                          num_qubits: int):
+        """
+        This instance method returns a 2D integer array of shape
+        (num_shots, num_blocks), where entry [i, j] is the measurement outcome
+        of measurement block j during shot i, expressed as the integer index of
+        its bitstring within obtain_binary_list(num_qubits).
+
+        Args:
+            num_qubits (int):
+                The number of qubits of the original quantum circuit.
+        """
+
+        mid_circuit_blocks_nr = self.num_clbits // num_qubits
+        block_indices = np.zeros((self.num_shots, mid_circuit_blocks_nr), dtype=np.int64)
+        for bit_idx in range(num_qubits):
+            # strided column views, so that (non-contiguous) views are not copied
+            block_bits = self.bits[:, bit_idx:mid_circuit_blocks_nr*num_qubits:num_qubits]
+            block_indices |= block_bits.astype(np.int64) << bit_idx
+        return block_indices
+
+    def get_counts_array(self,
+                         num_qubits: int):
+        """
+        This instance method returns a 2D integer array of shape
+        (num_blocks, 2**num_qubits), where row j contains the measurement counts
+        of measurement block j, ordered as in obtain_binary_list(num_qubits).
+
+        The counts of all blocks are obtained with a single np.bincount call.
+
+        Args:
+            num_qubits (int):
+                The number of qubits of the original quantum circuit.
+        """
+
+        block_indices = self.get_block_indices(num_qubits)
+        mid_circuit_blocks_nr = block_indices.shape[1]
+        block_offsets = np.arange(mid_circuit_blocks_nr, dtype=np.int64) * 2**num_qubits
+        counts_array = np.bincount((block_indices + block_offsets).ravel(),
+                                   minlength=mid_circuit_blocks_nr * 2**num_qubits)
+        return counts_array.reshape(mid_circuit_blocks_nr, 2**num_qubits)
+
+    def get_sparse_counts(self,
+                          num_qubits: int):
+        """
+        This instance method returns a list containing a SparseCounts object for
+        each measurement block, storing only the observed outcomes.
+
+        Args:
+            num_qubits (int):
+                The number of qubits of the original quantum circuit.
+        """
+
+        block_indices = self.get_block_indices(num_qubits)
+        total_counts = []
+        for mcm_block_idx in range(block_indices.shape[1]):
+            outcomes, counts = np.unique(block_indices[:, mcm_block_idx], return_counts=True)
+            total_counts.append(SparseCounts(outcomes, counts, num_qubits))
+        return total_counts
+
+def get_multi_counts_array(raw_data_shots: list | ShotMatrix,
+                           num_qubits: int):
+    """
+    This function is the array counterpart of get_multi_counts. It returns
+    a 2D integer array of shape (num_blocks, 2**num_qubits), where row j contains
+    the counts of measurement block j, ordered as in obtain_binary_list(num_qubits).
+
+    Args:
+        raw_data_shots (list | ShotMatrix):
+            The raw data shots, either as a list of bitstrings (see get_multi_counts)
+            or as an already parsed ShotMatrix object.
+
+        num_qubits (int):
+            The number of qubits of the original quantum circuit.
+    """
+
+    if not isinstance(raw_data_shots, ShotMatrix):
+        raw_data_shots = ShotMatrix.from_memory(raw_data_shots)
+    return raw_data_shots.get_counts_array(num_qubits)
+
+def get_multi_counts(raw_data_shots: list | ShotMatrix,
+                     num_qubits: int,
+                     sparse: bool = False):
     """
     This function returns a list containing entries of all count dictionaries
     for each measurement block within one quantum circuit.
@@ -71,7 +402,7 @@ def get_multi_counts(raw_data_shots: list,
     measurement block of a given quantum circuit.
 
     Args:
-        raw_data_shots (list):
+        raw_data_shots (list | ShotMatrix):
             The raw data shots returned from quantum circuits containing
             a single or multiple mid-circuit measurement blocks.
 
@@ -83,30 +414,163 @@ def get_multi_counts(raw_data_shots: list,
             is 'cK-1,cK-2,...,c2,c1,c0', meaning that the rightmost bit corresponds
             to the very first bit in the bit register.
 
+            An already parsed ShotMatrix object is also accepted, in which case
+            the bitstrings are not parsed again.
+
         num_qubits (int):
             The number of qubits of the original quantum circuit.
+
+        sparse (bool):
+            If True, each measurement block is returned as a SparseCounts object
+            containing only the observed bitstrings, instead of a dictionary
+            pre-filled with all 2**num_qubits bitstrings.
     """
 
+    if sparse == True:
+        if not isinstance(raw_data_shots, ShotMatrix):
+            raw_data_shots = ShotMatrix.from_memory(raw_data_shots)
+        return raw_data_shots.get_sparse_counts(num_qubits)
+
     binary_list = obtain_binary_list(num_qubits)
-    mid_circuit_blocks_nr = int(len(raw_data_shots[0]) / num_qubits)
+    counts_array = get_multi_counts_array(raw_data_shots, num_qubits)
 
     total_counts = []
-    for mcm_block_idx in range(mid_circuit_blocks_nr):
+    for block_counts in counts_array:
+        total_counts.append(dict(zip(binary_list, block_counts.tolist())))
+    return total_counts
+
+def iter_shot_chunks(raw_data_source,
+                     chunk_size: int = 2**14,
+                     num_clbits: int = None):
+    """
+    This generator function reads raw data shots from a source in chunks of
+    a fixed number of shots, and yields each chunk as a ShotMatrix object, so that
+    only a single chunk needs to be held in memory at any time.
+
+    Args:
+        raw_data_source:
+            The source of the raw data shots. It can be any of the following:
+            * an iterable (e.g. list or generator) of bitstrings following the
+              convention 'cK-1,cK-2,...,c2,c1,c0',
+            * a 2D array-like object of zeros and ones with shape (num_shots, num_clbits)
+              that supports row slicing and follows the HDF5 convention of the
+              StoreProjectRecord class, e.g. an np.ndarray or an h5py dataset
+              (bit-packed h5py datasets are decoded transparently),
+            * a ShotMatrix object,
+            * an object providing an iter_memory_chunks(chunk_size) method,
+              e.g. a RetrieveProjectRecord object.
+
+        chunk_size (int):
+            The (maximum) number of shots contained in each chunk.
+
+        num_clbits (int):
+            The size of the bit register, used when parsing bitstrings.
+            Defaults to None, in which case it is defined by the longest bitstring
+            of the first chunk. Specify it (e.g. qc.num_clbits) when the bitstrings
+            are not padded to the full register size.
+    """
+
+    if chunk_size < 1:
+        raise ValueError(f"chunk_size must be a positive integer, got {chunk_size}.")
+
+    if isinstance(raw_data_source, ShotMatrix):
+        for start in range(0, raw_data_source.num_shots, chunk_size):
+            yield ShotMatrix(raw_data_source.bits[start:start+chunk_size])
+
+    elif hasattr(raw_data_source, 'iter_memory_chunks'):
+        for bits_chunk in raw_data_source.iter_memory_chunks(chunk_size):
+            yield ShotMatrix(bits_chunk)
+
+    elif getattr(raw_data_source, 'ndim', None) == 2:
+        attrs = getattr(raw_data_source, 'attrs', {})
+        for start in range(0, raw_data_source.shape[0], chunk_size):
+            bits_chunk = raw_data_source[start:start+chunk_size]
+            if attrs.get('Format') == 'packed':
+                bits_chunk = np.unpackbits(bits_chunk, axis=1, count=int(attrs['Number of classical bits']),
+                                           bitorder='little')
+            yield ShotMatrix(bits_chunk)
+
+    else:
+        shots_iterator = iter(raw_data_source)
+        while True:
+            shots_chunk = list(islice(shots_iterator, chunk_size))
+            if len(shots_chunk) == 0:
+                return
+            shot_matrix = ShotMatrix.from_memory(shots_chunk, num_clbits)
+            num_clbits = shot_matrix.num_clbits
+            yield shot_matrix
+
+def stream_multi_counts_array(raw_data_source,
+                              num_qubits: int,
+                              chunk_size: int = 2**14,
+                              num_clbits: int = None):
+    """
+    This function is the streaming counterpart of get_multi_counts_array.
+    The raw data shots are read in chunks of chunk_size shots, and the counts of
+    each measurement block are accumulated incrementally, keeping memory bounded
+    by the chunk size instead of the total number of shots.
+
+    Args:
+        raw_data_source:
+            The source of the raw data shots (see iter_shot_chunks).
+
+        num_qubits (int):
+            The number of qubits of the original quantum circuit.
+
+        chunk_size (int):
+            The (maximum) number of shots read in each chunk.
+
+        num_clbits (int):
+            The size of the bit register (see iter_shot_chunks).
+    """
 
-        counts_dict = {}
-        for entry in binary_list:
-            counts_dict[entry] = 0
+    total_counts_array = None
+    for shot_matrix in iter_shot_chunks(raw_data_source, chunk_size, num_clbits):
+        counts_array = shot_matrix.get_counts_array(num_qubits)
+        if total_counts_array is None:
+            total_counts_array = counts_array
+        elif counts_array.shape != total_counts_array.shape:
+            raise ValueError("All raw data shots must contain the same number of measurement blocks.")
+        else:
+            total_counts_array += counts_array
+
+    if total_counts_array is None:
+        raise ValueError("The raw data source does not contain any shots.")
+    return total_counts_array
+
+def stream_multi_counts(raw_data_source,
+                        num_qubits: int,
+                        chunk_size: int = 2**14,
+                        num_clbits: int = None):
+    """
+    This function is the streaming counterpart of get_multi_counts, returning
+    the same list of count dictionaries (one for each measurement block), while
+    reading the raw data shots in chunks of chunk_size shots.
+
+    e.g. for merging the raw data of multiple results without holding all of
+    them in memory at once,
+    raw_data_source = (shot for result in results for shot in result.get_memory())
+
+    Args:
+        raw_data_source:
+            The source of the raw data shots (see iter_shot_chunks).
+
+        num_qubits (int):
+            The number of qubits of the original quantum circuit.
 
-        for shot_idx in range(len(raw_data_shots)):
-            reversed_shots = raw_data_shots[shot_idx][::-1]
+        chunk_size (int):
+            The (maximum) number of shots read in each chunk.
 
-            binary_string_reversed = reversed_shots[mcm_block_idx*num_qubits:(mcm_block_idx+1)*num_qubits]
-            # in order to ensure that len(binary_string) == num_qubits,
-            binary_string = binary_string_reversed[::-1]
-            binary_string = np.binary_repr(int(binary_string, 2), num_qubits)
-            counts_dict[binary_string] += 1
+        num_clbits (int):
+            The size of the bit register (see iter_shot_chunks).
+    """
+
+    binary_list = obtain_binary_list(num_qubits)
+    counts_array = stream_multi_counts_array(raw_data_source, num_qubits, chunk_size, num_clbits)
 
-        total_counts.append(counts_dict)
+    total_counts = []
+    for block_counts in counts_array:
+        total_counts.append(dict(zip(binary_list, block_counts.tolist())))
     return total_counts
 
 def get_multi_probs(raw_data_counts: list[dict]):
@@ -138,6 +602,125 @@ def get_multi_probs(raw_data_counts: list[dict]):
     return probabilities
 
 
+def bit_count(values: np.ndarray):
+    """
+    This function returns the number of bits set to one (population count)
+    for each entry of an array of non-negative integers of up to 64 bits.
+
+    Args:
+        values (np.ndarray):
+            An array of non-negative integers.
+    """
+
+    values = np.asarray(values).astype(np.uint64)
+    values = values - ((values >> np.uint64(1)) & np.uint64(0x5555555555555555))
+    values = (values & np.uint64(0x3333333333333333)) + ((values >> np.uint64(2)) & np.uint64(0x3333333333333333))
+    values = (values + (values >> np.uint64(4))) & np.uint64(0x0F0F0F0F0F0F0F0F)
+    return ((values * np.uint64(0x0101010101010101)) >> np.uint64(56)).astype(np.int64)
+
+def get_observable_masks(observables: list[str]):
+    """
+    This function converts a list of observables expressed in the Z basis
+    into integer bit masks, where bit i of the mask is set when the observable
+    acts with a Pauli Z on qubit qi.
+
+    e.g. for observables = ['IZ', 'ZZ'], masks = [1, 3]
+
+    Args:
+        observables (list[str]):
+            The observables, following the convention 'Pn-1,Pn-2,...,P2,P1,P0'
+            and containing only Paulis I and Z.
+    """
+
+    masks = []
+    for observable in observables:
+        if 'X' in observable or 'Y' in observable:
+            raise ValueError(f"Observable {observable} must not contain Paulis X or Y.")
+        if len(observable.strip('IZ')) != 0:
+            raise ValueError(f"Observable {observable} must contain only Paulis I and Z.")
+        if len(observable) != len(observables[0]):
+            raise ValueError("All observables must act on the same number of qubits.")
+        masks.append(int(observable.replace('I', '0').replace('Z', '1'), 2))
+    return np.array(masks, dtype=np.uint64)
+
+def multi_observable_expectation_values_Z_basis(measurement_data,
+                                                observables: list[str]):
+    """
+    This function calculates the expectation values of multiple observables
+    in the Z basis, for all measurement blocks at once, without constructing
+    any (2**n x 2**n) observable matrices.
+
+    The eigenvalue of a Z-basis Pauli string P for a measurement outcome b is
+    given by the parity of the bits of b on which P acts non-trivially,
+    i.e. (-1)**popcount(b & mask(P)).
+
+    Args:
+        measurement_data:
+            The measurement data of each measurement block, in any of the
+            following formats:
+            * a list of dictionaries each containing the measurement counts or
+              probabilities of a certain measurement block (as returned from
+              get_multi_counts, get_multi_probs or get_ro_corrected_multi_probs).
+              Outcomes which are absent from a dictionary are treated as zero.
+            * a 2D array of shape (num_blocks, 2**num_qubits) containing counts
+              or probabilities (as returned from get_multi_counts_array).
+            * a ShotMatrix object, whose measurement blocks are of size len(observables[0]).
+
+            Counts are normalized for each measurement block, so that these can be
+            used directly in place of probabilities.
+
+        observables (list[str]):
+            The observables for which this function calculates the expectation values of.
+            They must be expressed in the Z basis, containing no Paulis X or Y, and
+            act on the same number of qubits.
+
+            For an n-qubit Pauli string P, where Pauli Pi acts on qubit qi, the order
+            in the string is 'Pn-1,Pn-2,...,P2,P1,P0'.
+
+    Returns:
+        A 2D array of shape (len(observables), num_blocks), where entry [i, j] is
+        the expectation value of observables[i] for measurement block j.
+    """
+
+    masks = get_observable_masks(observables)
+    num_qubits = len(observables[0])
+
+    if isinstance(measurement_data, ShotMatrix):
+        block_indices = measurement_data.get_block_indices(num_qubits).astype(np.uint64)
+        expectation_values = np.zeros((len(masks), block_indices.shape[1]), dtype=np.float64)
+        for mask_idx in range(len(masks)):
+            parities = bit_count(block_indices & masks[mask_idx]) & 1
+            expectation_values[mask_idx] = 1 - 2 * parities.mean(axis=0)
+        return expectation_values
+
+    if isinstance(measurement_data, np.ndarray):
+        weights = np.atleast_2d(measurement_data).astype(np.float64)
+        if weights.shape[1] != 2**num_qubits:
+            raise ValueError(f"Expected {2**num_qubits} outcomes per measurement block, got {weights.shape[1]}.")
+        outcomes = np.arange(2**num_qubits, dtype=np.uint64)
+        signs = 1 - 2 * (bit_count(outcomes[np.newaxis, :] & masks[:, np.newaxis]) & 1)
+        return (signs @ weights.T) / weights.sum(axis=1)
+
+    block_ids = []
+    outcomes = []
+    weights = []
+    for block_idx, block_data in enumerate(measurement_data):
+        for bitstring, weight in block_data.items():
+            block_ids.append(block_idx)
+            outcomes.append(int(bitstring, 2))
+            weights.append(weight)
+    num_blocks = len(measurement_data)
+    block_ids = np.array(block_ids, dtype=np.int64)
+    outcomes = np.array(outcomes, dtype=np.uint64)
+    weights = np.array(weights, dtype=np.float64)
+
+    total_weights = np.bincount(block_ids, weights=weights, minlength=num_blocks)
+    expectation_values = np.zeros((len(masks), num_blocks), dtype=np.float64)
+    for mask_idx in range(len(masks)):
+        signs = 1 - 2 * (bit_count(outcomes & masks[mask_idx]) & 1)
+        expectation_values[mask_idx] = np.bincount(block_ids, weights=signs * weights, minlength=num_blocks)
+    return expectation_values / total_weights
+
 def observable_expectation_values_Z_basis(probabilities: list[dict],
                                           observable: str):
     """
@@ -148,6 +731,9 @@ def observable_expectation_values_Z_basis(probabilities: list[dict],
     must be applied in the quantum circuit so that those are projected to the
     Z basis.
 
+    For evaluating many observables at once, or directly from counts or from
+    a ShotMatrix, see multi_observable_expectation_values_Z_basis.
+
     Args:
         probabilitites (list[dict]):
             A list of dictionaries each containing the measurement probabilities
@@ -165,19 +751,5 @@ def observable_expectation_values_Z_basis(probabilities: list[dict],
             qubit q0 while operator I corresponds to qubit q1.
     """
 
-    if 'X' in observable or 'Y' in observable:
-        raise ValueError(f"Observable {observable} must not contain Paulis X or Y.")
-    
-    num_qubits = len(observable)
-    binary_list = obtain_binary_list(num_qubits)
-
-    observable_values = []
-    observable_matrix = np.real(SparsePauliOp([observable]).to_matrix())
-
-    for entry_idx in range(len(probabilities)):
-        observable = 0
-        for binary_idx in range(len(binary_list)):
-            observable += probabilities[entry_idx][binary_list[binary_idx]] * observable_matrix[binary_idx][binary_idx]
-        observable_values.append(observable)
-
-    return observable_values
\ No newline at end of file
+    observable_values = multi_observable_expectation_values_Z_basis(probabilities, [observable])
+    return observable_values[0].tolist()
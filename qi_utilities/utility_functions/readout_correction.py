@@ -7,27 +7,42 @@ raw data shots in order to mitigate readout errors.
 Authors: Marios Samiotis
 """
 
+import ast
+import time
+import warnings
 import numpy as np
 from scipy.optimize import minimize
+from scipy.sparse import csr_matrix, diags
+from scipy.sparse.linalg import LinearOperator, gmres
 import matplotlib.pyplot as plt
 import matplotlib.patheffects as path_effects
 from matplotlib.colors import LinearSegmentedColormap, Normalize
-from qiskit import QuantumCircuit, transpile
+from qiskit import QuantumCircuit
 from qiskit.result.result import Result
 from qiskit_quantuminspire.qi_backend import QIBackend
-from qi_utilities.utility_functions.circuit_modifiers import apply_readout_circuit
-from qi_utilities.utility_functions.raw_data_processing import obtain_binary_list, get_multi_counts
-from qi_utilities.utility_functions.data_handling import StoreProjectRecord
+from qi_utilities.utility_functions.circuit_modifiers import (apply_readout_circuit, apply_multi_group_readout_circuit,
+                                                              get_ro_register_length)
+from qi_utilities.utility_functions.raw_data_processing import (obtain_binary_list, get_multi_counts_array, ShotMatrix,
+                                                                bit_count)
+from qi_utilities.utility_functions.data_handling import StoreProjectRecord, ROAssignmentMatrixCache
+from qi_utilities.utility_functions.transpilation import transpile_cached
 from qi_utilities.device_simulation.simulators import NoisySimulator
 
 def split_raw_shots(result: Result,
                     qubit_list: list,
-                    circuit_nr: int = None):
+                    circuit_nr: int = None,
+                    mode: str = 'full',
+                    qubit_groups: list[list] = None):
     """
     This function splits the raw data shots of the measurement result
     into two groups, for a circuit containing readout mitigation circuits
     at its end.
 
+    The raw data shots are parsed only once into a ShotMatrix, and the two
+    returned groups are ShotMatrix views of its columns, sharing the same
+    underlying array. Both can be passed directly to the counting and readout
+    correction functions, and also behave as sequences of bitstrings.
+
     Args:
         result (Result):
             The result of a job (project), as returned from
@@ -42,22 +57,82 @@ def split_raw_shots(result: Result,
             The circuit number within a job, since a job can contain
             multiple quantum circuits.
             Defaults to None for a job with a single quantum circuit.
+
+        mode (str):
+            The readout calibration mode with which the readout circuit was
+            applied (see apply_readout_circuit).
+
+        qubit_groups (list(list)):
+            The qubit groups, in case the readout circuit was applied with
+            apply_multi_group_readout_circuit instead. Defaults to None.
     """
 
     num_qubits = len(qubit_list)
-    raw_shots = result.get_memory(circuit_nr)
+    if qubit_groups is not None:
+        ro_register_length = sum(get_ro_register_length(len(group)) for group in qubit_groups)
+    else:
+        ro_register_length = get_ro_register_length(num_qubits, mode)
+    raw_shots = ShotMatrix.from_memory(result.get_memory(circuit_nr))
+
+    # the readout mitigation bits are the leftmost ones in the bitstrings
+    num_experiment_bits = raw_shots.num_clbits - ro_register_length
+    experiment_shots = raw_shots.get_columns(0, num_experiment_bits)
+    ro_mitigation_shots = raw_shots.get_columns(num_experiment_bits, raw_shots.num_clbits)
+    return experiment_shots, ro_mitigation_shots
 
-    experiment_shots = []
-    ro_mitigation_shots = []
+def project_onto_probability_simplex(vectors: np.ndarray):
+    """
+    This function computes the Euclidean projection of each row of a 2D array
+    onto the probability simplex, i.e. the closest vector (in the least squares
+    sense) whose entries are non-negative and sum up to 1. The projection of all
+    rows is computed at once, in a vectorized manner.
 
-    for raw_shots_entry in range(len(raw_shots)):
-        ro_mitigation_shots.append(raw_shots[raw_shots_entry][0:num_qubits*2**num_qubits])
-        experiment_shots.append(raw_shots[raw_shots_entry][num_qubits*2**num_qubits::])
-    return experiment_shots, ro_mitigation_shots
+    Args:
+        vectors (np.ndarray):
+            A 2D array of shape (num_vectors, vector_length).
+    """
+
+    vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float64))
+    sorted_vectors = -np.sort(-vectors, axis=1)
+    cumulative_sums = np.cumsum(sorted_vectors, axis=1) - 1
+    positions = np.arange(1, vectors.shape[1] + 1)
+    support_size = np.count_nonzero(sorted_vectors - cumulative_sums / positions > 0, axis=1)
+    thresholds = cumulative_sums[np.arange(len(vectors)), support_size - 1] / support_size
+    return np.maximum(vectors - thresholds[:, np.newaxis], 0)
+
+def apply_tensored_ro_matrices(probs_matrix: np.ndarray,
+                               ro_assignment_matrices: np.ndarray):
+    """
+    This function applies a tensored readout assignment matrix, i.e. the Kronecker
+    product of the per-qubit 2x2 readout assignment matrices, on the probability
+    vectors of all measurement blocks, without ever forming the dense
+    (2**n x 2**n) matrix. Each 2x2 matrix is contracted with the axis of the
+    respective qubit, so that the cost scales as n * 2**n instead of 4**n.
+
+    Args:
+        probs_matrix (np.ndarray):
+            A 2D array of shape (num_blocks, 2**n) containing the probability vectors,
+            ordered as in obtain_binary_list(n).
+
+        ro_assignment_matrices (np.ndarray):
+            An array of shape (n, 2, 2) containing the 2x2 matrix of each qubit,
+            ordered as in qubit_list (see extract_tensored_ro_assignment_matrices).
+    """
+
+    num_qubits = len(ro_assignment_matrices)
+    num_blocks = len(probs_matrix)
+    probs_tensor = np.asarray(probs_matrix, dtype=np.float64).reshape((num_blocks,) + (2,) * num_qubits)
+    for qubit_idx in range(num_qubits):
+        # bit q0 is the rightmost one in the bitstrings, hence the last tensor axis
+        qubit_axis = num_qubits - qubit_idx
+        probs_tensor = np.moveaxis(np.tensordot(ro_assignment_matrices[qubit_idx], probs_tensor,
+                                                axes=([1], [qubit_axis])), 0, qubit_axis)
+    return probs_tensor.reshape(num_blocks, 2**num_qubits)
 
 def get_ro_corrected_multi_probs(raw_data_probs: list[dict],
                                  ro_assignment_matrix: np.ndarray,
-                                 qubit_list: list):
+                                 qubit_list: list,
+                                 method: str = 'least_squares'):
     """
     This function takes as input the raw data probabilities and applies the
     readout assignment matrix in order to mitigate readout errors.
@@ -70,48 +145,238 @@ def get_ro_corrected_multi_probs(raw_data_probs: list[dict],
                                     ...]
 
         ro_assignment_matrix (np.ndarray):
-            The readout assignment matrix.
+            The readout assignment matrix. A tensored readout assignment matrix, as
+            returned from extract_tensored_ro_assignment_matrices, i.e. an array of
+            shape (n, 2, 2), is also accepted, in which case the dense matrix is never
+            formed.
 
         qubit_list (list):
             An ordered list containing the integer indices of the qubits
             used in the original quantum circuit.
             e.g. for qubits q0 and q2, qubit_list = [0, 2].
+
+        method (str):
+            The method used for mitigating the readout errors.
+            * 'least_squares': all measurement blocks are corrected at once, by solving
+              the (unconstrained) least squares problem for all blocks with a single
+              factorization of the readout assignment matrix, followed by a vectorized
+              projection onto the probability simplex.
+            * 'SLSQP': for each measurement block separately, the least squares problem
+              is solved under the constraint that the corrected probabilities are
+              non-negative and sum up to 1, using scipy.optimize.minimize.
+            The two methods coincide whenever the unconstrained solution is already
+            a valid probability distribution.
     """
 
     num_qubits = len(qubit_list)
     binary_list = obtain_binary_list(num_qubits)
-    
+
+    probs_matrix = np.array([[raw_data_probs[entry_idx].get(bitstring, 0) for bitstring in binary_list]
+                             for entry_idx in range(len(raw_data_probs))], dtype=np.float64)
+
+    ro_assignment_matrix = np.asarray(ro_assignment_matrix, dtype=np.float64)
+    tensored = ro_assignment_matrix.ndim == 3
+    if tensored:
+        def apply_ro_assignment_matrix(x):
+            return apply_tensored_ro_matrices(np.atleast_2d(x), ro_assignment_matrix).reshape(np.shape(x))
+    else:
+        def apply_ro_assignment_matrix(x):
+            return ro_assignment_matrix @ x
+
+    if method == 'least_squares':
+        if tensored:
+            probs_matrix_ro_corrected = apply_tensored_ro_matrices(probs_matrix,
+                                                                   np.linalg.inv(ro_assignment_matrix))
+        else:
+            probs_matrix_ro_corrected = np.linalg.lstsq(ro_assignment_matrix, probs_matrix.T, rcond=None)[0].T
+        probs_matrix_ro_corrected = project_onto_probability_simplex(probs_matrix_ro_corrected)
+
+    elif method == 'SLSQP':
+        probs_matrix_ro_corrected = np.zeros_like(probs_matrix)
+        for entry_idx in range(len(probs_matrix)):
+
+            probs = probs_matrix[entry_idx]
+
+            def objective(x):
+                return np.linalg.norm(apply_ro_assignment_matrix(x) - probs) ** 2
+            constraints = {
+                "type": "eq",
+                "fun": lambda x: np.sum(x) - 1
+            }
+            bounds = [(0, 1)] * len(probs)
+            result = minimize(
+                objective,
+                x0=np.ones(len(probs)) / len(probs),  # initial guess: uniform distribution
+                method="SLSQP",
+                bounds=bounds,
+                constraints=constraints
+            )
+            probs_matrix_ro_corrected[entry_idx] = result.x
+
+    else:
+        raise ValueError(f"Unknown readout correction method '{method}'. Choose between 'least_squares' and 'SLSQP'.")
+
     raw_data_probs_ro_corrected = []
+    for probs_ro_corrected in probs_matrix_ro_corrected:
+        raw_data_probs_ro_corrected.append(dict(zip(binary_list, probs_ro_corrected.tolist())))
+    return raw_data_probs_ro_corrected
 
-    for entry_idx in range(len(raw_data_probs)):
+def get_ro_subspace_corrected_multi_probs(raw_data_counts: list[dict],
+                                          ro_assignment_matrices: np.ndarray | dict,
+                                          qubit_list: list,
+                                          distance: int = 3):
+    """
+    This function mitigates readout errors within the subspace of the observed
+    bitstrings only, in the spirit of the matrix-free measurement mitigation (M3)
+    method, so that memory and time scale with the number of distinct observed
+    outcomes instead of 2**n. It is therefore suited for many-qubit experiments,
+    where most of the 2**n outcomes are never observed.
+
+    For each measurement block, a reduced readout assignment operator is built
+    on the fly from the per-qubit (or per-group) readout assignment matrices,
+    keeping only the elements between observed bitstrings which are within a
+    certain Hamming distance from each other. Its columns are renormalized to
+    account for the truncation, and the resulting sparse linear system is solved
+    with the iterative GMRES solver, using a Jacobi preconditioner. The solution
+    is finally projected onto the probability simplex.
 
-        probs = np.array(list(raw_data_probs[entry_idx].values()))
+    Args:
+        raw_data_counts (list[dict]):
+            A list of dictionaries (or SparseCounts objects) each containing the
+            measurement counts or probabilities of a certain measurement block.
 
-        def objective(x):
-            return np.linalg.norm(ro_assignment_matrix @ x - probs) ** 2
-        constraints = {
-            "type": "eq",
-            "fun": lambda x: np.sum(x) - 1
-        }
-        bounds = [(0, 1)] * len(probs)
-        result = minimize(
-            objective,
-            x0=np.ones(len(probs)) / len(probs),  # initial guess: uniform distribution
-            method="SLSQP",
-            bounds=bounds,
-            constraints=constraints
-        )
-
-        probs_ro_corrected_dict = {}
-        for idx in range(len(result.x)):
-            probs_ro_corrected_dict[binary_list[idx]] = result.x[idx]
-
-        raw_data_probs_ro_corrected.append(probs_ro_corrected_dict)
+        ro_assignment_matrices (np.ndarray | dict):
+            Either the per-qubit readout assignment matrices, as returned from
+            extract_tensored_ro_assignment_matrices, or a dictionary of readout
+            assignment matrices of disjoint groups of qubits, as returned from
+            extract_ro_assignment_matrices, whose groups together contain all
+            qubits of qubit_list.
+
+        qubit_list (list):
+            An ordered list containing the integer indices of the qubits
+            used in the original quantum circuit.
+            e.g. for qubits q0 and q2, qubit_list = [0, 2].
+
+        distance (int):
+            The maximum Hamming distance between two observed bitstrings for which
+            the readout assignment operator element is taken into account.
+
+    Returns:
+        A list of dictionaries each containing the readout-corrected probabilities
+        of the observed bitstrings of a certain measurement block. A ValueError
+        is raised for measurement blocks without any observed bitstrings.
+    """
+
+    num_qubits = len(qubit_list)
+    if num_qubits > 63:
+        raise ValueError("Subspace readout correction supports up to 63 qubits.")
+
+    if isinstance(ro_assignment_matrices, dict):
+        ro_matrix_groups = [([qubit_list.index(qubit) for qubit in ast.literal_eval(group_key)], np.asarray(matrix))
+                            for group_key, matrix in ro_assignment_matrices.items()]
+    else:
+        ro_matrix_groups = [([qubit_idx], np.asarray(ro_assignment_matrices[qubit_idx]))
+                            for qubit_idx in range(num_qubits)]
+    grouped_positions = sorted(position for positions, matrix in ro_matrix_groups for position in positions)
+    if grouped_positions != list(range(num_qubits)):
+        raise ValueError("The readout assignment matrices must cover each qubit of qubit_list exactly once.")
+
+    raw_data_probs_ro_corrected = []
+    for block_idx, block_counts in enumerate(raw_data_counts):
+        observed_counts = {bitstring: count for bitstring, count in block_counts.items() if count != 0}
+        if len(observed_counts) == 0:
+            raise ValueError(f"Measurement block {block_idx} contains no observed bitstrings, "
+                             f"hence its readout-corrected probabilities are undefined.")
+        outcomes = np.array([int(bitstring, 2) for bitstring in observed_counts], dtype=np.uint64)
+        probs = np.array(list(observed_counts.values()), dtype=np.float64)
+        probs /= probs.sum()
+        num_outcomes = len(outcomes)
+
+        # index of each observed outcome within the readout assignment matrix of each group
+        local_indices = []
+        for positions, matrix in ro_matrix_groups:
+            local_index = np.zeros(num_outcomes, dtype=np.int64)
+            for local_position, position in enumerate(positions):
+                local_index |= ((outcomes >> np.uint64(position)) & np.uint64(1)).astype(np.int64) << local_position
+            local_indices.append(local_index)
+
+        rows, columns, values = [], [], []
+        chunk_size = max(1, 2**22 // num_outcomes)
+        for start in range(0, num_outcomes, chunk_size):
+            hamming_distances = bit_count(outcomes[start:start+chunk_size, np.newaxis] ^ outcomes[np.newaxis, :])
+            chunk_rows, chunk_columns = np.nonzero(hamming_distances <= distance)
+            chunk_rows += start
+            chunk_values = np.ones(len(chunk_rows), dtype=np.float64)
+            for (positions, matrix), local_index in zip(ro_matrix_groups, local_indices):
+                chunk_values *= matrix[local_index[chunk_rows], local_index[chunk_columns]]
+            rows.append(chunk_rows)
+            columns.append(chunk_columns)
+            values.append(chunk_values)
+
+        reduced_matrix = csr_matrix((np.concatenate(values), (np.concatenate(rows), np.concatenate(columns))),
+                                    shape=(num_outcomes, num_outcomes))
+        column_sums = np.asarray(reduced_matrix.sum(axis=0)).ravel()
+        reduced_matrix = reduced_matrix @ diags(1 / column_sums)
+
+        inverse_diagonal = 1 / reduced_matrix.diagonal()
+        preconditioner = LinearOperator((num_outcomes, num_outcomes),
+                                        matvec=lambda x: inverse_diagonal * np.ravel(x))
+        quasi_probs, info = gmres(reduced_matrix, probs, x0=probs, M=preconditioner, rtol=1e-10, atol=1e-12)
+        if info != 0:
+            warnings.warn(f"\nGMRES did not converge within {info} iterations.\n", UserWarning)
+
+        probs_ro_corrected = project_onto_probability_simplex(quasi_probs)[0]
+        raw_data_probs_ro_corrected.append({format(int(outcome), f'0{num_qubits}b'): float(prob)
+                                            for outcome, prob in zip(outcomes, probs_ro_corrected)})
     return raw_data_probs_ro_corrected
 
+def benchmark_ro_correction_methods(raw_data_probs: list[dict],
+                                    ro_assignment_matrix: np.ndarray,
+                                    qubit_list: list,
+                                    methods: tuple = ('least_squares', 'SLSQP')):
+    """
+    This function benchmarks the readout correction methods of
+    get_ro_corrected_multi_probs on the same input data. It returns a dictionary
+    containing, for each method, the wall-clock time in seconds and the maximum
+    absolute deviation of its corrected probabilities from those of the first method.
+
+    Args:
+        raw_data_probs (list):
+            A list of dictionaries each containing the measurement probabilities
+            of a certain measurement block.
+
+        ro_assignment_matrix (np.ndarray):
+            The readout assignment matrix.
+
+        qubit_list (list):
+            An ordered list containing the integer indices of the qubits
+            used in the original quantum circuit.
+
+        methods (tuple):
+            The readout correction methods to be benchmarked.
+    """
+
+    benchmark = {}
+    reference_probs = None
+    for method in methods:
+        start_time = time.perf_counter()
+        corrected_probs = get_ro_corrected_multi_probs(raw_data_probs, ro_assignment_matrix, qubit_list, method)
+        elapsed_time = time.perf_counter() - start_time
+
+        corrected_probs = np.array([list(block_probs.values()) for block_probs in corrected_probs])
+        if reference_probs is None:
+            reference_probs = corrected_probs
+        benchmark[method] = {
+            'Time [s]': elapsed_time,
+            'Max absolute deviation': float(np.max(np.abs(corrected_probs - reference_probs), initial=0.0))
+        }
+    return benchmark
+
 def measure_ro_assignment_matrix(backend: QIBackend | NoisySimulator,
                                  qubit_list: list,
-                                 num_shots: int = 2**12):
+                                 num_shots: int = 2**12,
+                                 mode: str = 'full',
+                                 cache: ROAssignmentMatrixCache = None):
     """
     This function can be used to measure the readout (ro) assignment
     matrix for an input list of qubits.
@@ -127,13 +392,30 @@ def measure_ro_assignment_matrix(backend: QIBackend | NoisySimulator,
 
         num_shots (int):
             The number of shots used to measure the ro assignment matrix.
+
+        mode (str):
+            The readout calibration mode (see apply_readout_circuit).
+            For mode = 'tensored', the per-qubit readout assignment matrices are
+            returned, as in extract_tensored_ro_assignment_matrices.
+
+        cache (ROAssignmentMatrixCache):
+            An optional readout assignment matrix cache. If a matrix measured for the
+            same backend, qubit_list, num_shots and mode is cached and not expired,
+            it is returned without submitting a new calibration job. Otherwise, the
+            newly measured matrix is stored in the cache.
+            Defaults to None, in which case a new calibration job is always submitted.
     """
-    
+
+    if cache is not None:
+        cached_ro_assignment_matrix = cache.get(backend.name, qubit_list, num_shots, mode)
+        if cached_ro_assignment_matrix is not None:
+            return cached_ro_assignment_matrix
+
     num_qubits = len(qubit_list)
     qc = QuantumCircuit(num_qubits,
                         name=f"Readout_Assignment_Matrix_{num_qubits}_Qubits")
-    qc = apply_readout_circuit(qc, [idx for idx in range(num_qubits)])
-    qc_transpiled = transpile(qc, backend, initial_layout=qubit_list)
+    qc = apply_readout_circuit(qc, [idx for idx in range(num_qubits)], mode)
+    qc_transpiled = transpile_cached(qc, backend, initial_layout=qubit_list)
     job = backend.run(qc_transpiled, shots=num_shots, memory = True)
     try:
         result = job.result(timeout = 10 * 6 * 600)
@@ -141,12 +423,79 @@ def measure_ro_assignment_matrix(backend: QIBackend | NoisySimulator,
         return str(error_message)
     StoreProjectRecord(job, silent=True)
 
-    raw_data_shots, ro_mitigation_shots = split_raw_shots(result, qubit_list)
-    ro_assignment_matrix = extract_ro_assignment_matrix(ro_mitigation_shots, qubit_list)
+    raw_data_shots, ro_mitigation_shots = split_raw_shots(result, qubit_list, mode=mode)
+    if mode == 'tensored':
+        ro_assignment_matrix = extract_tensored_ro_assignment_matrices(ro_mitigation_shots, qubit_list)
+    else:
+        ro_assignment_matrix = extract_ro_assignment_matrix(ro_mitigation_shots, qubit_list)
+
+    if cache is not None:
+        cache.put(backend.name, qubit_list, num_shots, ro_assignment_matrix, mode)
+    return ro_assignment_matrix
+
+def measure_ro_assignment_matrices(backend: QIBackend | NoisySimulator,
+                                   qubit_groups: list[list],
+                                   num_shots: int = 2**12,
+                                   cache: ROAssignmentMatrixCache = None):
+    """
+    This function can be used to measure the readout (ro) assignment
+    matrices of several disjoint groups of qubits within a single job,
+    by preparing and measuring the basis states of all groups simultaneously
+    (see apply_multi_group_readout_circuit).
 
-    return ro_assignment_matrix # take transpose for correct definition
+    e.g. qubit_groups = [[0], [1], ..., [8]] calibrates the per-qubit readout
+    of a whole 9-qubit chip with a single job containing two measurement blocks.
+
+    Args:
+        backend (QIBackend | NoisySimulator):
+            The hardware or simulator backend.
+
+        qubit_groups (list(list)):
+            An ordered list of lists containing disjoint groups of qubits.
+            e.g. qubit_groups = [[0, 2], [1, 3]].
+
+        num_shots (int):
+            The number of shots used to measure the ro assignment matrices.
+
+        cache (ROAssignmentMatrixCache):
+            An optional readout assignment matrix cache (see measure_ro_assignment_matrix).
+            The job is submitted only if the matrix of any group is not cached.
+
+    Returns:
+        A dictionary with the readout assignment matrix of each group, in the same
+        format as extract_ro_assignment_matrices.
+    """
+
+    if cache is not None:
+        cached_ro_assignment_matrices = cache.get_matrices(backend.name, qubit_groups, num_shots)
+        if cached_ro_assignment_matrices is not None:
+            return cached_ro_assignment_matrices
+
+    flattened_qubits = [qubit_idx for qubit_list in qubit_groups for qubit_idx in qubit_list]
+    num_qubits = len(flattened_qubits)
+    virtual_qubit_groups = []
+    for qubit_list in qubit_groups:
+        virtual_qubit_groups.append([flattened_qubits.index(qubit_idx) for qubit_idx in qubit_list])
+
+    qc = QuantumCircuit(num_qubits,
+                        name=f"Readout_Assignment_Matrices_{len(qubit_groups)}_Groups")
+    qc = apply_multi_group_readout_circuit(qc, virtual_qubit_groups)
+    qc_transpiled = transpile_cached(qc, backend, initial_layout=flattened_qubits)
+    job = backend.run(qc_transpiled, shots=num_shots, memory = True)
+    try:
+        result = job.result(timeout = 10 * 6 * 600)
+    except Exception as error_message:
+        return str(error_message)
+    StoreProjectRecord(job, silent=True)
 
-def extract_ro_assignment_matrix(ro_mitigation_shots: list,
+    ro_assignment_matrices = extract_ro_assignment_matrices(result.get_memory(), qubit_groups)
+
+    if cache is not None:
+        for qubit_list in qubit_groups:
+            cache.put(backend.name, qubit_list, num_shots, ro_assignment_matrices[f"{qubit_list}"])
+    return ro_assignment_matrices
+
+def extract_ro_assignment_matrix(ro_mitigation_shots: list | ShotMatrix,
                                  qubit_list: list):
     """
     This function uses as input the raw data shots from the readout
@@ -154,7 +503,7 @@ def extract_ro_assignment_matrix(ro_mitigation_shots: list,
     quantum circuit, and extracts the readout assignment matrix.
 
     Args:
-        ro_mitigation_shots (list):
+        ro_mitigation_shots (list | ShotMatrix):
             The raw data shots returned from the readout mitigation
             quantum circuits which contain multiple mid-circuit
             measurement blocks.
@@ -174,17 +523,57 @@ def extract_ro_assignment_matrix(ro_mitigation_shots: list,
     """
 
     num_qubits = len(qubit_list)
-    prepared_states = obtain_binary_list(num_qubits)
-    
-    ro_counts_per_prepared_states = get_multi_counts(ro_mitigation_shots, num_qubits)
-    assignment_probability_matrix = np.zeros([len(prepared_states), len(prepared_states)], dtype=np.float64)
-    for prepared_state_idx in range(len(prepared_states)):
-        assignment_probability_matrix[prepared_state_idx] = np.array([ro_counts_per_prepared_states[prepared_state_idx][state]
-                                                 for state in prepared_states]) / len(ro_mitigation_shots)
+
+    ro_counts_per_prepared_states = get_multi_counts_array(ro_mitigation_shots, num_qubits)[:2**num_qubits]
+    assignment_probability_matrix = ro_counts_per_prepared_states / len(ro_mitigation_shots)
 
     return assignment_probability_matrix.T # take transpose for correct definition
 
-def extract_ro_assignment_matrices(ro_mitigation_shots: list,
+def extract_tensored_ro_assignment_matrices(ro_mitigation_shots: list | ShotMatrix,
+                                            qubit_list: list):
+    """
+    This function uses as input the raw data shots from the readout
+    mitigation circuits applied in the 'tensored' mode (see apply_readout_circuit),
+    and extracts a 2x2 readout assignment matrix for each qubit individually.
+    The full readout assignment matrix is then approximated as their Kronecker
+    product, neglecting readout crosstalk.
+
+    Args:
+        ro_mitigation_shots (list | ShotMatrix):
+            The raw data shots returned from the readout mitigation
+            quantum circuits, containing the two measurement blocks of the
+            prepared states |0...0> and |1...1>.
+
+            The convention followed in each bitstring for a bit register of size K
+            is 'cK-1,cK-2,...,c2,c1,c0', meaning that the rightmost bit corresponds
+            to the very first bit in the bit register.
+
+        qubit_list (list):
+            An ordered list containing the integer indices of the qubits
+            used in the original quantum circuit.
+            e.g. for qubits q0 and q2, qubit_list = [0, 2].
+
+    Returns:
+        An array of shape (n, 2, 2), where entry [i] is the readout assignment matrix
+        of qubit qubit_list[i], with the declared state as the row index and the
+        prepared state as the column index.
+    """
+
+    num_qubits = len(qubit_list)
+    if not isinstance(ro_mitigation_shots, ShotMatrix):
+        ro_mitigation_shots = ShotMatrix.from_memory(ro_mitigation_shots, 2*num_qubits)
+
+    p1_given_0 = ro_mitigation_shots.bits[:, 0:num_qubits].mean(axis=0)
+    p1_given_1 = ro_mitigation_shots.bits[:, num_qubits:2*num_qubits].mean(axis=0)
+
+    assignment_probability_matrices = np.zeros([num_qubits, 2, 2], dtype=np.float64)
+    assignment_probability_matrices[:, 0, 0] = 1 - p1_given_0
+    assignment_probability_matrices[:, 1, 0] = p1_given_0
+    assignment_probability_matrices[:, 0, 1] = 1 - p1_given_1
+    assignment_probability_matrices[:, 1, 1] = p1_given_1
+    return assignment_probability_matrices
+
+def extract_ro_assignment_matrices(ro_mitigation_shots: list | ShotMatrix,
                                    qubit_groups: list[list]):
     """
     This function expands on the extract_ro_assignment_matrix, using it
@@ -193,7 +582,7 @@ def extract_ro_assignment_matrices(ro_mitigation_shots: list,
     totality of ro_mitigation_shots.
 
     Args:
-        ro_mitigation_shots (list):
+        ro_mitigation_shots (list | ShotMatrix):
             The raw data shots returned from the readout mitigation
             quantum circuits which contain multiple mid-circuit
             measurement blocks.
@@ -213,27 +602,28 @@ def extract_ro_assignment_matrices(ro_mitigation_shots: list,
             e.g. qubit_groups = [[0, 2], [1, 3]].
     """
 
+    if not isinstance(ro_mitigation_shots, ShotMatrix):
+        ro_mitigation_shots = ShotMatrix.from_memory(ro_mitigation_shots)
+
     bit_idx = 0
     assignment_probability_matrices = {}
     for qubit_list in qubit_groups:
         register_length = len(qubit_list)*2**len(qubit_list)
-        reduced_ro_mitigation_shots = [bitstring[bit_idx:bit_idx+register_length] for bitstring in ro_mitigation_shots]
-        num_qubits = len(qubit_list)
-        prepared_states = obtain_binary_list(num_qubits)
-    
-        ro_counts_per_prepared_states = get_multi_counts(reduced_ro_mitigation_shots, num_qubits)
-        assignment_probability_matrix = np.zeros([len(prepared_states), len(prepared_states)], dtype=np.float64)
-        for prepared_state_idx in range(len(prepared_states)):
-            assignment_probability_matrix[prepared_state_idx] = np.array([ro_counts_per_prepared_states[prepared_state_idx][state]
-                                                    for state in prepared_states]) / len(reduced_ro_mitigation_shots)
-        
-        assignment_probability_matrices[f"{qubit_list}"] = assignment_probability_matrix.T # take transpose for correct definition
+        # bit_idx counts from the leftmost bit of the bitstrings, i.e. the last column
+        reduced_ro_mitigation_shots = ro_mitigation_shots.get_columns(ro_mitigation_shots.num_clbits - bit_idx - register_length,
+                                                                      ro_mitigation_shots.num_clbits - bit_idx)
+        assignment_probability_matrices[f"{qubit_list}"] = extract_ro_assignment_matrix(reduced_ro_mitigation_shots,
+                                                                                         qubit_list)
         bit_idx += register_length
 
     return assignment_probability_matrices
 
 def plot_ro_assignment_matrix(ro_assignment_matrix: np.ndarray,
-                              qubit_list: list):
+                              qubit_list: list,
+                              annotate: str = 'auto',
+                              max_annotated_qubits: int = 4,
+                              file_path: str = None,
+                              dpi: int = 300):
     """
     This function creates and prints a figure of the readout assignment
     matrix.
@@ -246,6 +636,27 @@ def plot_ro_assignment_matrix(ro_assignment_matrix: np.ndarray,
             An ordered list containing the integer indices of the qubits
             used in the original quantum circuit.
             e.g. for qubits q0 and q2, qubit_list = [0, 2].
+
+        annotate (str):
+            Specifies which cells are annotated with their probability value.
+            Drawing a (stroked) text for every cell dominates the rendering time
+            of large matrices.
+            * 'all': all cells are annotated.
+            * 'diagonal': only the diagonal cells, and the largest off-diagonal cell
+              of each prepared state (column), are annotated.
+            * 'none': no cells are annotated.
+            * 'auto': 'all' for up to max_annotated_qubits qubits, else 'diagonal'.
+
+        max_annotated_qubits (int):
+            The maximum number of qubits for which all cells are annotated
+            when annotate = 'auto'.
+
+        file_path (str):
+            If specified, the figure is saved directly to this file path and closed,
+            instead of being shown with plt.show(). Useful for bulk plotting.
+
+        dpi (int):
+            The resolution of the figure in dots per inch.
     """
 
     def red_white_green_cmap():
@@ -271,8 +682,13 @@ def plot_ro_assignment_matrix(ro_assignment_matrix: np.ndarray,
     for binary_str_idx in range(2**num_qubits):
         binary_labels.append(r"$|$" + f"{np.binary_repr(binary_str_idx, num_qubits)}" + r"$\rangle$")
 
+    if annotate == 'auto':
+        annotate = 'all' if num_qubits <= max_annotated_qubits else 'diagonal'
+
     fig_size = max(6, len(binary_labels) * 0.4)
-    fig, ax = plt.subplots(figsize=(fig_size, fig_size), dpi=300)
+    if annotate != 'all':
+        fig_size = min(fig_size, 12) # cells need not fit a text, so the figure is capped
+    fig, ax = plt.subplots(figsize=(fig_size, fig_size), dpi=dpi)
 
     qubit_list_label = r"$|$"
     for qubit_idx in qubit_list[::-1]:
@@ -297,24 +713,39 @@ def plot_ro_assignment_matrix(ro_assignment_matrix: np.ndarray,
 
     plt.setp(ax.get_xticklabels(), ha="center")
 
-    values = np.zeros((len(binary_labels), len(binary_labels)))
-    for i in range(len(binary_labels)):
-        for j in range(len(binary_labels)):
-            values[i, j] = ro_assignment_matrix[i, j] * 100
-            cell_fontsize = max(2, 10 - 0.15 * len(binary_labels))
-            txt = ax.text(j, i, f"{values[i, j]:.1f}%", ha="center", va="center",
-                    color="white", fontweight="bold", fontsize=cell_fontsize)
-            txt.set_path_effects([
-                path_effects.Stroke(linewidth=2, foreground="black"),
-                path_effects.Normal()
-            ])
+    values = np.asarray(ro_assignment_matrix, dtype=np.float64)[:len(binary_labels), :len(binary_labels)] * 100
+
+    if annotate == 'all':
+        annotated_cells = np.ones(values.shape, dtype=bool)
+    elif annotate == 'diagonal':
+        annotated_cells = np.eye(len(binary_labels), dtype=bool)
+        off_diagonal_values = np.where(annotated_cells, -np.inf, values)
+        if len(binary_labels) > 1:
+            annotated_cells[np.argmax(off_diagonal_values, axis=0), np.arange(len(binary_labels))] = True
+    elif annotate == 'none':
+        annotated_cells = np.zeros(values.shape, dtype=bool)
+    else:
+        raise ValueError(f"Unknown annotate option '{annotate}'. Choose between 'auto', 'all', 'diagonal' and 'none'.")
+
+    cell_fontsize = max(2, 10 - 0.15 * len(binary_labels))
+    for i, j in zip(*np.nonzero(annotated_cells)):
+        txt = ax.text(j, i, f"{values[i, j]:.1f}%", ha="center", va="center",
+                color="white", fontweight="bold", fontsize=cell_fontsize)
+        txt.set_path_effects([
+            path_effects.Stroke(linewidth=2, foreground="black"),
+            path_effects.Normal()
+        ])
 
     cmap = red_white_green_cmap()
     norm = Normalize(vmin=0, vmax=100)
 
-    cax = ax.imshow(values, cmap=cmap, norm=norm)
+    cax = ax.imshow(values, cmap=cmap, norm=norm, interpolation='nearest', rasterized=True)
     cbar = fig.colorbar(cax, ax=ax, fraction=0.046, pad=0.04, label="Probability (%)")
     cbar.set_ticks(ticks=list(np.arange(0, 110, 10)))
 
     plt.tight_layout()
-    plt.show()
\ No newline at end of file
+    if file_path is not None:
+        fig.savefig(file_path)
+        plt.close(fig)
+    else:
+        plt.show()
\ No newline at end of file
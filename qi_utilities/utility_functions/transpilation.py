@@ -0,0 +1,334 @@
+"""
+Utility classes and functions for caching the transpilation of
+Qiskit QuantumCircuit objects ('qc'), so that structurally identical
+circuits, e.g. within parameter sweep loops, are transpiled only once
+for a given backend and set of transpile options.
+
+Authors: Marios Samiotis
+"""
+
+import hashlib
+import numpy as np
+from collections import OrderedDict
+from pathlib import Path
+from qiskit import QuantumCircuit, transpile, qpy
+from qiskit.circuit import Clbit, ClassicalRegister, ControlFlowOp, ParameterExpression, SwitchCaseOp
+from qiskit.circuit.classical import expr
+from qiskit.circuit.library import get_standard_gate_name_mapping
+
+STANDARD_OPERATION_TYPES = tuple({type(operation) for operation in get_standard_gate_name_mapping().values()})
+
+def circuit_structure_hash(qc: QuantumCircuit):
+    """
+    This function returns a hash of the structure of a quantum circuit, i.e. of its
+    registers and of the sequence of its instructions (operations, parameters, qubits
+    and classical bits). The circuit name and metadata are not part of the hash.
+
+    Besides their parameters, the hash also covers the operators (e.g. of a
+    PauliEvolutionGate) and the definitions of all non-standard operations, as well
+    as the conditions, targets and cases of the control flow operations, all of
+    them being hashed recursively.
+
+    Unbound parameters are hashed by name, hence a parametrized circuit can be
+    transpiled once, with its parameters being assigned to the transpiled circuit
+    afterwards, e.g. qc_transpiled.assign_parameters(values).
+
+    If the circuit contains a value that cannot be hashed reliably, i.e. one whose
+    representation is not determined by its content, the function returns None.
+
+    Args:
+        qc (QuantumCircuit):
+            The quantum circuit object.
+    """
+
+    hash_object = hashlib.sha256()
+
+    def value_key(qc: QuantumCircuit, value):
+        if isinstance(value, Clbit):
+            return ('clbit', qc.find_bit(value).index)
+        if isinstance(value, ClassicalRegister):
+            return ('creg', value.name, value.size)
+        if isinstance(value, expr.Expr):
+            return ('expr', repr(value), [value_key(qc, var.var) if isinstance(var.var, (Clbit, ClassicalRegister))
+                                          else var.name for var in expr.iter_vars(value)])
+        if isinstance(value, (tuple, list)):
+            return tuple(value_key(qc, item) for item in value)
+        if hasattr(value, 'to_list'):
+            # e.g. the SparsePauliOp operator of a PauliEvolutionGate
+            return (type(value).__name__, repr(value.to_list()))
+        value_repr = repr(value)
+        if ' at 0x' in value_repr:
+            raise ValueError(f"The value {value_repr} cannot be hashed reliably.")
+        return value_repr
+
+    def update_hash(qc: QuantumCircuit):
+        hash_object.update(repr((qc.num_qubits, qc.num_clbits, str(qc.global_phase),
+                                 [(register.name, register.size) for register in qc.qregs],
+                                 [(register.name, register.size) for register in qc.cregs])).encode())
+        for instruction in qc.data:
+            operation = instruction.operation
+            hash_object.update(repr((operation.name, operation.num_qubits, operation.num_clbits,
+                                     getattr(operation, 'unit', None),
+                                     [qc.find_bit(qubit).index for qubit in instruction.qubits],
+                                     [qc.find_bit(clbit).index for clbit in instruction.clbits])).encode())
+            for param in operation.params:
+                if isinstance(param, QuantumCircuit):
+                    update_hash(param)
+                elif isinstance(param, np.ndarray):
+                    hash_object.update(param.tobytes())
+                elif isinstance(param, ParameterExpression):
+                    hash_object.update(str(param).encode())
+                else:
+                    hash_object.update(repr(value_key(qc, param)).encode())
+
+            if isinstance(operation, ControlFlowOp):
+                for attribute_name in ['condition', 'target']:
+                    if getattr(operation, attribute_name, None) is not None:
+                        hash_object.update(repr((attribute_name,
+                                                 value_key(qc, getattr(operation, attribute_name)))).encode())
+                if isinstance(operation, SwitchCaseOp):
+                    hash_object.update(repr([value_key(qc, values)
+                                             for values, _ in operation.cases_specifier()]).encode())
+            elif not isinstance(operation, STANDARD_OPERATION_TYPES):
+                if getattr(operation, 'operator', None) is not None:
+                    hash_object.update(repr(value_key(qc, operation.operator)).encode())
+                if getattr(operation, 'definition', None) is not None:
+                    update_hash(operation.definition)
+
+    try:
+        update_hash(qc)
+    except ValueError:
+        return None
+    return hash_object.hexdigest()
+
+def transpile_target_key(backend = None,
+                         **transpile_options):
+    """
+    This function returns a key identifying the transpilation target, i.e. the
+    backend (name, number of qubits, operations and coupling map) together with
+    all transpile options, such as the basis gates, the coupling map, the initial
+    layout and the optimization level.
+
+    Args:
+        backend:
+            The backend for which the circuits are transpiled, or None.
+
+        transpile_options:
+            The keyword arguments passed to qiskit.transpile.
+    """
+
+    backend_key = None
+    if backend is not None:
+        coupling_map = getattr(backend, 'coupling_map', None)
+        backend_key = (backend.name,
+                       getattr(backend, 'num_qubits', None),
+                       sorted(getattr(backend, 'operation_names', [])),
+                       sorted(coupling_map.get_edges()) if coupling_map is not None else None)
+
+    options_key = []
+    for option_name in sorted(transpile_options):
+        option_value = transpile_options[option_name]
+        if hasattr(option_value, 'get_edges'):
+            option_value = sorted(option_value.get_edges())
+        options_key.append((option_name, repr(option_value)))
+
+    return hashlib.sha256(repr((backend_key, options_key)).encode()).hexdigest()
+
+class TranspileCache:
+    """
+    This class is responsible for caching transpiled quantum circuits, keyed by
+    the structural hash of the circuit (see circuit_structure_hash) together with
+    the transpilation target (see transpile_target_key).
+
+    The cache keeps at most max_entries transpiled circuits in memory, evicting the
+    least recently used ones, while optionally it also stores them on disk in QPY
+    format, so that they can be reused across processes and sessions.
+
+    Cache hits return copies of the cached transpiled circuits, which carry the name
+    and metadata of the submitted circuits and can therefore be safely modified.
+    """
+
+    def __init__(self,
+                 max_entries: int = 256,
+                 directory: str = None):
+        """
+        Args:
+            max_entries (int):
+                The maximum number of transpiled circuits kept in memory.
+
+            directory (str):
+                Specifies the directory path in which the transpiled circuits are
+                stored on disk. Defaults to None, in which case they are only
+                kept in memory.
+        """
+
+        self.max_entries = max_entries
+        self.directory = Path(directory) if directory is not None else None
+        self.transpiled_circuits = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self,
+            cache_key: str):
+        """
+        This instance method returns the cached transpiled circuit for the given key,
+        or None if it is not cached (neither in memory nor on disk).
+
+        Args:
+            cache_key (str):
+                The cache key of the transpiled circuit.
+        """
+
+        if cache_key in self.transpiled_circuits:
+            self.transpiled_circuits.move_to_end(cache_key)
+            return self.transpiled_circuits[cache_key]
+
+        if self.directory is not None:
+            cache_file_path = self.directory / f"transpiled_circuit_{cache_key}.qpy"
+            if cache_file_path.exists():
+                with open(cache_file_path, 'rb') as file:
+                    qc_transpiled = qpy.load(file)[0]
+                self.put(cache_key, qc_transpiled, store_on_disk=False)
+                return qc_transpiled
+        return None
+
+    def put(self,
+            cache_key: str,
+            qc_transpiled: QuantumCircuit,
+            store_on_disk: bool = True):
+        """
+        This instance method caches a transpiled circuit under the given key.
+
+        Args:
+            cache_key (str):
+                The cache key of the transpiled circuit.
+
+            qc_transpiled (QuantumCircuit):
+                The transpiled quantum circuit object.
+
+            store_on_disk (bool):
+                A flag for also storing the transpiled circuit on disk, if the cache
+                has a directory.
+        """
+
+        self.transpiled_circuits[cache_key] = qc_transpiled
+        self.transpiled_circuits.move_to_end(cache_key)
+        while len(self.transpiled_circuits) > self.max_entries:
+            self.transpiled_circuits.popitem(last=False)
+
+        if store_on_disk == True and self.directory is not None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            cache_file_path = self.directory / f"transpiled_circuit_{cache_key}.qpy"
+            temporary_path = cache_file_path.with_suffix(".tmp")
+            with open(temporary_path, 'wb') as file:
+                qpy.dump(qc_transpiled, file)
+            temporary_path.replace(cache_file_path)
+
+    def clear(self):
+        """
+        This instance method removes all transpiled circuits from the cache,
+        both in memory and on disk.
+        """
+
+        self.transpiled_circuits.clear()
+        if self.directory is not None:
+            for cache_file_path in self.directory.glob("transpiled_circuit_*.qpy"):
+                cache_file_path.unlink()
+
+    def transpile(self,
+                  qc: QuantumCircuit | list,
+                  backend = None,
+                  **transpile_options):
+        """
+        This instance method transpiles a quantum circuit, or a list of quantum circuits,
+        in the same manner as qiskit.transpile, but transpiles only the circuits which
+        are not already cached, all of them within a single qiskit.transpile call.
+
+        Args:
+            qc (QuantumCircuit | list):
+                The quantum circuit object. Can also be a list containing
+                multiple quantum circuits.
+
+            backend:
+                The backend for which the circuits are transpiled.
+
+            transpile_options:
+                Any other keyword arguments of qiskit.transpile, e.g. initial_layout,
+                basis_gates, coupling_map or optimization_level.
+        """
+
+        qc_list = qc if isinstance(qc, list) else [qc]
+        target_key = transpile_target_key(backend, **transpile_options)
+        cache_keys = []
+        for circuit in qc_list:
+            structure_hash = circuit_structure_hash(circuit)
+            # circuits which cannot be hashed reliably are transpiled without caching
+            cache_keys.append(f"{structure_hash[:32]}_{target_key[:32]}" if structure_hash is not None else None)
+
+        cached_circuits = [self.get(cache_key) if cache_key is not None else None for cache_key in cache_keys]
+        missing_circuit_indices = {}
+        for circuit_idx, cache_key in enumerate(cache_keys):
+            if cached_circuits[circuit_idx] is None:
+                # structurally identical circuits of the same call are transpiled only once
+                missing_circuit_indices.setdefault(cache_key if cache_key is not None else circuit_idx, circuit_idx)
+        self.hits += len(qc_list) - len(missing_circuit_indices)
+        self.misses += len(missing_circuit_indices)
+
+        if len(missing_circuit_indices) > 0:
+            transpiled_circuits = transpile([qc_list[circuit_idx] for circuit_idx in missing_circuit_indices.values()],
+                                            backend, **transpile_options)
+            transpiled_circuits = dict(zip(missing_circuit_indices, transpiled_circuits))
+            for cache_key, qc_transpiled in transpiled_circuits.items():
+                if isinstance(cache_key, str):
+                    self.put(cache_key, qc_transpiled)
+            cached_circuits = [transpiled_circuits.get(cache_key if cache_key is not None else circuit_idx, cached_circuit)
+                               for circuit_idx, (cache_key, cached_circuit) in enumerate(zip(cache_keys, cached_circuits))]
+
+        qc_transpiled_list = []
+        for circuit, qc_transpiled in zip(qc_list, cached_circuits):
+            qc_transpiled = qc_transpiled.copy(name=circuit.name)
+            qc_transpiled.metadata = dict(circuit.metadata)
+            # parameters are hashed by name, hence a cached circuit may contain distinct Parameter
+            # objects of the same names, which are replaced by those of the submitted circuit
+            circuit_parameters = {parameter.name: parameter for parameter in circuit.parameters}
+            parameter_map = {parameter: circuit_parameters[parameter.name] for parameter in qc_transpiled.parameters
+                             if circuit_parameters.get(parameter.name, parameter) is not parameter}
+            if len(parameter_map) > 0:
+                qc_transpiled.assign_parameters(parameter_map, inplace=True)
+            qc_transpiled_list.append(qc_transpiled)
+
+        if isinstance(qc, list):
+            return qc_transpiled_list
+        return qc_transpiled_list[0]
+
+DEFAULT_TRANSPILE_CACHE = TranspileCache()
+
+def transpile_cached(qc: QuantumCircuit | list,
+                     backend = None,
+                     cache: TranspileCache = None,
+                     **transpile_options):
+    """
+    This function transpiles a quantum circuit, or a list of quantum circuits, in the
+    same manner as qiskit.transpile, while reusing the previously transpiled circuits
+    of a TranspileCache for structurally identical circuits and the same target.
+
+    Args:
+        qc (QuantumCircuit | list):
+            The quantum circuit object. Can also be a list containing
+            multiple quantum circuits.
+
+        backend:
+            The backend for which the circuits are transpiled.
+
+        cache (TranspileCache):
+            The transpile cache to be used. Defaults to None, in which case the
+            module-level DEFAULT_TRANSPILE_CACHE (in memory only) is used.
+
+        transpile_options:
+            Any other keyword arguments of qiskit.transpile, e.g. initial_layout,
+            basis_gates, coupling_map or optimization_level.
+    """
+
+    if cache is None:
+        cache = DEFAULT_TRANSPILE_CACHE
+    return cache.transpile(qc, backend, **transpile_options)
@@ -0,0 +1,69 @@
+"""
+Comparison tests of the array-backed raw data processing against the
+original string-based implementations.
+"""
+
+import numpy as np
+from qiskit.quantum_info import SparsePauliOp
+from qi_utilities.utility_functions.raw_data_processing import (ShotMatrix, obtain_binary_list,
+                                                                 get_multi_counts, get_multi_counts_array,
+                                                                 get_multi_probs,
+                                                                 multi_observable_expectation_values_Z_basis)
+
+def random_memory(num_shots: int, num_clbits: int, seed: int = 1234):
+    rng = np.random.default_rng(seed)
+    bits = rng.integers(0, 2, size=(num_shots, num_clbits))
+    return [''.join(str(bit) for bit in shot_bits) for shot_bits in bits]
+
+def baseline_multi_counts(raw_data_shots: list, num_qubits: int):
+    binary_list = obtain_binary_list(num_qubits)
+    total_counts = []
+    for block_idx in range(len(raw_data_shots[0]) // num_qubits):
+        counts = {bitstring: 0 for bitstring in binary_list}
+        for shot in raw_data_shots:
+            reversed_shot = shot[::-1]
+            bitstring = reversed_shot[block_idx*num_qubits:(block_idx+1)*num_qubits][::-1]
+            counts[np.binary_repr(int(bitstring, 2), num_qubits)] += 1
+        total_counts.append(counts)
+    return total_counts
+
+def test_multi_counts_equal_baseline():
+    raw_data_shots = random_memory(num_shots=500, num_clbits=9)
+    expected_counts = baseline_multi_counts(raw_data_shots, num_qubits=3)
+    assert get_multi_counts(raw_data_shots, 3) == expected_counts
+    assert get_multi_counts(ShotMatrix.from_memory(raw_data_shots), 3) == expected_counts
+
+def test_multi_counts_array_equals_baseline():
+    raw_data_shots = random_memory(num_shots=500, num_clbits=8)
+    binary_list = obtain_binary_list(2)
+    expected_counts = [[block_counts[bitstring] for bitstring in binary_list]
+                       for block_counts in baseline_multi_counts(raw_data_shots, num_qubits=2)]
+    np.testing.assert_array_equal(get_multi_counts_array(raw_data_shots, 2), expected_counts)
+
+def test_sparse_multi_counts_equal_baseline():
+    raw_data_shots = random_memory(num_shots=200, num_clbits=10)
+    expected_counts = baseline_multi_counts(raw_data_shots, num_qubits=5)
+    sparse_counts = get_multi_counts(raw_data_shots, 5, sparse=True)
+    for block_counts, block_expected_counts in zip(sparse_counts, expected_counts):
+        assert {bitstring: block_counts.get(bitstring, 0) for bitstring in block_expected_counts} == block_expected_counts
+
+def baseline_expectation_values(probabilities: list[dict], observable: str):
+    binary_list = obtain_binary_list(len(observable))
+    observable_matrix = np.real(SparsePauliOp([observable]).to_matrix())
+    return [sum(probs[binary_list[idx]] * observable_matrix[idx][idx] for idx in range(len(binary_list)))
+            for probs in probabilities]
+
+def test_parity_expectation_values_equal_baseline():
+    raw_data_shots = random_memory(num_shots=500, num_clbits=9)
+    observables = ['ZII', 'IZI', 'IIZ', 'ZZI', 'ZIZ', 'IZZ', 'ZZZ', 'III']
+    raw_data_counts = get_multi_counts(raw_data_shots, 3)
+    raw_data_probs = get_multi_probs(raw_data_counts)
+    expected_values = np.array([baseline_expectation_values(raw_data_probs, observable)
+                                for observable in observables])
+
+    for measurement_data in (raw_data_probs,
+                             raw_data_counts,
+                             get_multi_counts_array(raw_data_shots, 3),
+                             ShotMatrix.from_memory(raw_data_shots)):
+        np.testing.assert_allclose(multi_observable_expectation_values_Z_basis(measurement_data, observables),
+                                   expected_values, atol=1e-12)
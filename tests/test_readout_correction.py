@@ -0,0 +1,72 @@
+"""
+Comparison tests of the vectorized readout correction against the dense
+and constrained-optimization formulations.
+"""
+
+import numpy as np
+from scipy.optimize import minimize
+from functools import reduce
+from qi_utilities.utility_functions.raw_data_processing import obtain_binary_list
+from qi_utilities.utility_functions.readout_correction import (project_onto_probability_simplex,
+                                                               apply_tensored_ro_matrices,
+                                                               get_ro_subspace_corrected_multi_probs)
+
+def random_ro_assignment_matrices(num_qubits: int, seed: int = 1234):
+    rng = np.random.default_rng(seed)
+    error_rates = rng.uniform(0.01, 0.08, size=(num_qubits, 2))
+    return np.array([[[1 - p0, p1], [p0, 1 - p1]] for p0, p1 in error_rates])
+
+def dense_ro_assignment_matrix(ro_assignment_matrices: np.ndarray):
+    # qubit q0 is the rightmost bit, hence the rightmost Kronecker factor
+    return reduce(np.kron, ro_assignment_matrices[::-1])
+
+def constrained_least_squares_projection(vector: np.ndarray):
+    result = minimize(lambda x: np.sum((x - vector) ** 2),
+                      x0=np.ones(len(vector)) / len(vector),
+                      method="SLSQP",
+                      bounds=[(0, 1)] * len(vector),
+                      constraints={"type": "eq", "fun": lambda x: np.sum(x) - 1},
+                      options={"ftol": 1e-14, "maxiter": 1000})
+    return result.x
+
+def test_simplex_projection_equals_constrained_least_squares():
+    rng = np.random.default_rng(1234)
+    vectors = np.vstack([rng.normal(0.125, 0.2, size=(20, 8)),
+                         rng.dirichlet(np.ones(8), size=5)])
+    projected_vectors = project_onto_probability_simplex(vectors)
+    expected_vectors = np.array([constrained_least_squares_projection(vector) for vector in vectors])
+    np.testing.assert_allclose(projected_vectors, expected_vectors, atol=1e-6)
+    np.testing.assert_allclose(projected_vectors.sum(axis=1), 1)
+    assert np.all(projected_vectors >= 0)
+
+def test_tensored_ro_matrices_equal_dense_product():
+    ro_assignment_matrices = random_ro_assignment_matrices(num_qubits=4)
+    probs_matrix = np.random.default_rng(1234).dirichlet(np.ones(16), size=3)
+    np.testing.assert_allclose(apply_tensored_ro_matrices(probs_matrix, ro_assignment_matrices),
+                               probs_matrix @ dense_ro_assignment_matrix(ro_assignment_matrices).T)
+
+def test_subspace_correction_at_full_distance_equals_dense_inversion():
+    num_qubits = 4
+    ro_assignment_matrices = random_ro_assignment_matrices(num_qubits)
+    dense_matrix = dense_ro_assignment_matrix(ro_assignment_matrices)
+    binary_list = obtain_binary_list(num_qubits)
+    ideal_probs = np.random.default_rng(1234).dirichlet(np.ones(2**num_qubits), size=3)
+    raw_data_probs = [dict(zip(binary_list, probs.tolist())) for probs in ideal_probs @ dense_matrix.T]
+
+    corrected_probs = get_ro_subspace_corrected_multi_probs(raw_data_probs, ro_assignment_matrices,
+                                                            qubit_list=list(range(num_qubits)),
+                                                            distance=num_qubits)
+    for block_corrected_probs, block_probs in zip(corrected_probs, raw_data_probs):
+        expected_probs = project_onto_probability_simplex(
+            np.linalg.solve(dense_matrix, [block_probs[bitstring] for bitstring in binary_list]))[0]
+        np.testing.assert_allclose([block_corrected_probs[bitstring] for bitstring in binary_list],
+                                   expected_probs, atol=1e-9)
+
+    grouped_ro_assignment_matrices = {'[0, 1]': dense_ro_assignment_matrix(ro_assignment_matrices[:2]),
+                                      '[2, 3]': dense_ro_assignment_matrix(ro_assignment_matrices[2:])}
+    grouped_corrected_probs = get_ro_subspace_corrected_multi_probs(raw_data_probs, grouped_ro_assignment_matrices,
+                                                                    qubit_list=list(range(num_qubits)),
+                                                                    distance=num_qubits)
+    for block_grouped_probs, block_corrected_probs in zip(grouped_corrected_probs, corrected_probs):
+        np.testing.assert_allclose([block_grouped_probs[bitstring] for bitstring in binary_list],
+                                   [block_corrected_probs[bitstring] for bitstring in binary_list], atol=1e-9)
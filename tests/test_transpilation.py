@@ -0,0 +1,64 @@
+"""
+Regression tests for the structural circuit hash of the transpilation cache.
+"""
+
+from qiskit import QuantumCircuit
+from qiskit.circuit import Gate, Parameter
+from qiskit.circuit.library import PauliEvolutionGate
+from qiskit.quantum_info import SparsePauliOp
+from qi_utilities.utility_functions.transpilation import circuit_structure_hash, TranspileCache
+
+def pauli_evolution_circuit(pauli_label: str):
+    qc = QuantumCircuit(2)
+    qc.append(PauliEvolutionGate(operator=SparsePauliOp(pauli_label), time=0.5), [0, 1])
+    return qc
+
+def if_test_circuit(condition_value: int):
+    qc = QuantumCircuit(2, 2)
+    qc.measure(0, 0)
+    with qc.if_test((qc.clbits[0], condition_value)):
+        qc.x(1)
+    return qc
+
+def custom_gate_circuit(rotation_angle: float):
+    definition = QuantumCircuit(1)
+    definition.rx(rotation_angle, 0)
+    custom_gate = Gate('custom', 1, [])
+    custom_gate.definition = definition
+    qc = QuantumCircuit(1)
+    qc.append(custom_gate, [0])
+    return qc
+
+def test_operators_are_hashed():
+    assert circuit_structure_hash(pauli_evolution_circuit('XX')) != circuit_structure_hash(pauli_evolution_circuit('ZZ'))
+    assert circuit_structure_hash(pauli_evolution_circuit('XX')) == circuit_structure_hash(pauli_evolution_circuit('XX'))
+
+def test_conditions_are_hashed():
+    assert circuit_structure_hash(if_test_circuit(0)) != circuit_structure_hash(if_test_circuit(1))
+    assert circuit_structure_hash(if_test_circuit(1)) == circuit_structure_hash(if_test_circuit(1))
+
+def test_definitions_are_hashed():
+    assert circuit_structure_hash(custom_gate_circuit(0.1)) != circuit_structure_hash(custom_gate_circuit(0.2))
+
+def test_transpile_cache_distinguishes_operators():
+    cache = TranspileCache()
+    qc_transpiled_xx, qc_transpiled_zz = cache.transpile([pauli_evolution_circuit('XX'), pauli_evolution_circuit('ZZ')],
+                                                          basis_gates=['rz', 'sx', 'x', 'cz'])
+    assert qc_transpiled_xx != qc_transpiled_zz
+    assert cache.misses == 2
+
+def test_cached_circuit_parameters_can_be_bound():
+    cache = TranspileCache()
+    qc_transpiled_list = []
+    for _ in range(2):
+        theta = Parameter('theta')
+        qc = QuantumCircuit(1, 1)
+        qc.rx(theta, 0)
+        qc.measure(0, 0)
+        qc_transpiled_list.append((theta, cache.transpile(qc, basis_gates=['rx', 'ry', 'cz'])))
+    assert cache.hits == 1
+
+    theta, qc_transpiled = qc_transpiled_list[1]
+    qc_bound = qc_transpiled.assign_parameters({theta: 0.3})
+    assert len(qc_bound.parameters) == 0
+    assert qc_bound.data[0].operation.params[0] == 0.3